@@ -0,0 +1,303 @@
+import json
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock, local
+
+from constants import (CATALOG_CACHE_MAX_ENTRIES, CATALOG_CACHE_TTL,
+                       FEED_CACHE_TTL, SHOPPING_LIST_CACHE_TIMEOUT)
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+from recipies.models import Recipe, ShoppingCart
+from rest_framework.utils.encoders import JSONEncoder
+from users.models import Subscription
+
+SHOPPING_LIST_KEY = 'shopping_list:{user_id}'
+FEED_KEY = 'recipe_feed:{user_id}'
+
+changed_recipes = local()
+touched_recipes = local()
+
+
+def get_shopping_list_etag(user, file_format):
+    """Строгий ETag по содержимому корзины и формату документа.
+
+    Учитывает состав корзины и дату изменения каждого рецепта в ней.
+    """
+    cart = (
+        ShoppingCart.objects
+        .filter(user=user)
+        .order_by('recipe_id')
+        .values_list('recipe_id', 'recipe__updated')
+    )
+    state = ';'.join(f'{recipe_id}:{updated.isoformat()}'
+                     for recipe_id, updated in cart)
+    digest = sha256(f'{file_format};{state}'.encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def get_cached_shopping_list(user, file_format, etag):
+    cached = cache.get(SHOPPING_LIST_KEY.format(user_id=user.id), {})
+    cached_etag, content = cached.get(file_format, (None, None))
+    if cached_etag == etag:
+        return content
+    return None
+
+
+def set_cached_shopping_list(user, file_format, etag, content):
+    key = SHOPPING_LIST_KEY.format(user_id=user.id)
+    cached = cache.get(key, {})
+    cached[file_format] = (etag, content)
+    cache.set(key, cached, SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def invalidate_shopping_lists(user_ids):
+    cache.delete_many(
+        [SHOPPING_LIST_KEY.format(user_id=user_id) for user_id in user_ids])
+
+
+def invalidate_recipe_shopping_lists(recipe_id):
+    """Сбрасывает списки покупок с этим рецептом после коммита.
+
+    Изменения многих строк в одной транзакции приводят к одному запросу
+    корзин при коммите.
+    """
+    if not hasattr(changed_recipes, 'ids'):
+        changed_recipes.ids = set()
+    changed_recipes.ids.add(recipe_id)
+    transaction.on_commit(flush_recipe_shopping_lists)
+
+
+def flush_recipe_shopping_lists():
+    recipe_ids = getattr(changed_recipes, 'ids', None)
+    if not recipe_ids:
+        return
+    changed_recipes.ids = set()
+    invalidate_shopping_lists(
+        ShoppingCart.objects
+        .filter(recipe_id__in=recipe_ids)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+
+
+def touch_recipe(recipe_id):
+    """Обновляет дату изменения рецепта после коммита.
+
+    Дата входит в ETag списка покупок. Изменения многих строк рецепта
+    в одной транзакции дают одно обновление.
+    """
+    if not hasattr(touched_recipes, 'ids'):
+        touched_recipes.ids = set()
+    touched_recipes.ids.add(recipe_id)
+    transaction.on_commit(flush_touched_recipes)
+
+
+def flush_touched_recipes():
+    recipe_ids = getattr(touched_recipes, 'ids', None)
+    if not recipe_ids:
+        return
+    touched_recipes.ids = set()
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated=timezone.now())
+
+
+def get_cached_feed(user, page_size):
+    """Первая страница ленты подписок для данного размера страницы."""
+    return cache.get(FEED_KEY.format(user_id=user.id), {}).get(page_size)
+
+
+def set_cached_feed(user, page_size, data):
+    key = FEED_KEY.format(user_id=user.id)
+    cached = cache.get(key, {})
+    cached[page_size] = data
+    cache.set(key, cached, FEED_CACHE_TTL)
+
+
+def invalidate_feeds(user_ids):
+    cache.delete_many([FEED_KEY.format(user_id=user_id)
+                       for user_id in user_ids])
+
+
+def invalidate_author_feeds(author_id):
+    """Сбрасывает ленты подписчиков автора после коммита."""
+    transaction.on_commit(lambda: invalidate_feeds(
+        Subscription.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    ))
+
+
+class CacheStats:
+    """Счетчики попаданий и промахов кеша."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else None,
+        }
+
+
+class TimedCacheStats(CacheStats):
+    """Счетчики кеша со средним временем ответа при попадании и промахе."""
+
+    def __init__(self):
+        super().__init__()
+        self.hit_seconds = 0
+        self.miss_seconds = 0
+
+    def record(self, hit, seconds):
+        if hit:
+            self.hit()
+            self.hit_seconds += seconds
+        else:
+            self.miss()
+            self.miss_seconds += seconds
+
+    def as_dict(self):
+        return {
+            **super().as_dict(),
+            'hit_ms': (self.hit_seconds / self.hits * 1000
+                       if self.hits else None),
+            'miss_ms': (self.miss_seconds / self.misses * 1000
+                        if self.misses else None),
+        }
+
+
+class CatalogEntry:
+
+    def __init__(self, data, version, last_modified):
+        self.data = data
+        self.version = version
+        self.last_modified = last_modified
+        self.created_at = time.monotonic()
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+        self.etag = f'"{sha256(content.encode()).hexdigest()}"'
+
+
+class CatalogCache:
+    """Кеш сериализованных справочников в памяти процесса.
+
+    Версия увеличивается сигналами при любом изменении справочника
+    в этом процессе. Изменения из других процессов подхватываются
+    не позже чем через CATALOG_CACHE_TTL секунд.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.version = 0
+        self.last_modified = time.time()
+        self.entries = OrderedDict()
+        self.ids = None
+        self.ids_created_at = 0
+        self.stats = CacheStats()
+        self.lock = Lock()
+
+    def bump(self):
+        with self.lock:
+            self.version += 1
+            self.last_modified = time.time()
+            self.entries.clear()
+            self.ids = None
+
+    def get_ids(self, load):
+        """Словарь id справочника по ключу, например по слагу тега.
+
+        Хранится отдельно от ответов: без ETag и без учета в статистике.
+        load() вызывается, если словаря нет или он старше
+        CATALOG_CACHE_TTL секунд.
+        """
+        ids = self.ids
+        if (ids is None
+                or time.monotonic() - self.ids_created_at > CATALOG_CACHE_TTL):
+            version = self.version
+            ids = load()
+            with self.lock:
+                if version == self.version:
+                    self.ids = ids
+                    self.ids_created_at = time.monotonic()
+        return ids
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if (entry is None or entry.version != self.version
+                or time.monotonic() - entry.created_at > CATALOG_CACHE_TTL):
+            self.stats.miss()
+            return None
+        self.stats.hit()
+        return entry
+
+    def set(self, key, data, version):
+        entry = CatalogEntry(data, version, self.last_modified)
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = entry
+                while len(self.entries) > CATALOG_CACHE_MAX_ENTRIES:
+                    self.entries.popitem(last=False)
+        return entry
+
+    def as_dict(self):
+        return {
+            'version': self.version,
+            'entries': len(self.entries),
+            **self.stats.as_dict(),
+        }
+
+
+class RecipeDetailCache:
+    """Общая для всех пользователей часть ответа GET /api/recipes/{id}/.
+
+    Хранится в кеше RECIPE_CACHE_ALIAS, флаги пользователя и абсолютные
+    ссылки на изображения подставляются при ответе.
+    """
+
+    name = 'recipes'
+    key = 'recipe_detail:{recipe_id}'
+
+    def __init__(self):
+        self.stats = TimedCacheStats()
+
+    @property
+    def backend(self):
+        return caches[settings.RECIPE_CACHE_ALIAS]
+
+    def get(self, recipe_id):
+        return self.backend.get(self.key.format(recipe_id=recipe_id))
+
+    def set(self, recipe_id, data):
+        self.backend.set(self.key.format(recipe_id=recipe_id), data)
+
+    def invalidate(self, recipe_ids):
+        """Удаляет записи после коммита.
+
+        Иначе параллельный GET между сбросом и коммитом снова закеширует
+        старые данные на весь TIMEOUT.
+        """
+        keys = [self.key.format(recipe_id=recipe_id)
+                for recipe_id in recipe_ids]
+        transaction.on_commit(lambda: self.backend.delete_many(keys))
+
+    def clear(self):
+        transaction.on_commit(self.backend.clear)
+
+    def as_dict(self):
+        return self.stats.as_dict()
+
+
+recipe_detail_cache = RecipeDetailCache()
+
+tag_catalog = CatalogCache('tags')
+ingredient_catalog = CatalogCache('ingredients')
+CATALOG_CACHES = (tag_catalog, ingredient_catalog)
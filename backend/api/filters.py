@@ -1,33 +1,113 @@
-from django_filters import (BooleanFilter, CharFilter, FilterSet,
-                            ModelMultipleChoiceFilter)
-from recipies.models import Ingredient, Recipe, Tag
+from constants import INGREDIENT_SEARCH_LIMIT
+from django import forms
+from django.db.models import Exists, OuterRef
+from django_filters import (BooleanFilter, CharFilter, ChoiceFilter, Filter,
+                            FilterSet)
+from django_filters.widgets import BooleanWidget
+from recipies.models import (Favorite, Ingredient, Recipe, RecipeTag,
+                             ShoppingCart, Tag)
+
+from .cache import tag_catalog
+from .search import search_ingredients, search_recipes
+
+SCORE_ORDERING = {
+    'popular': 'popularity',
+    'trending': 'trending',
+}
+
+
+def get_tag_ids(slugs):
+    """id тегов по слагам из кеша справочника тегов."""
+    ids = tag_catalog.get_ids(
+        lambda: dict(Tag.objects.values_list('slug', 'id')))
+    return {ids[slug] for slug in slugs if slug in ids}
+
+
+class SlugListField(forms.Field):
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [str(slug) for slug in value or ()]
+
+
+class SlugListFilter(Filter):
+    """Несколько значений параметра, например tags=a&tags=b."""
+
+    field_class = SlugListField
 
 
 class IngredientFilter(FilterSet):
-    name = CharFilter(field_name='name', lookup_expr='icontains')
+    name = CharFilter(method='search_by_name')
 
     class Meta:
         model = Ingredient
-        fields = {'name': ['exact']}
+        fields = ('name',)
+
+    def search_by_name(self, queryset, name, value):
+        return search_ingredients(queryset, value, INGREDIENT_SEARCH_LIMIT)
 
 
 class RecipeFilter(FilterSet):
     author = CharFilter()
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        label='Tags',
-        to_field_name='slug'
+    tags = SlugListFilter(method='filter_tags', label='Tags')
+    tags_mode = ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='skip'
+    )
+    is_favorited = BooleanFilter(method='get_is_favorited',
+                                 widget=BooleanWidget)
+    is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart',
+                                        widget=BooleanWidget)
+    search = CharFilter(method='search_by_text')
+    ordering = ChoiceFilter(
+        choices=(('popular', 'Популярные'), ('trending', 'В тренде')),
+        method='order_by_score'
     )
-    is_favorited = BooleanFilter(method='get_is_favorited')
-    is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'tags_mode', 'author', 'is_favorited',
+                  'is_in_shopping_cart', 'search', 'ordering')
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты с тегами через EXISTS по RecipeTag, без дублей строк."""
+        if not value:
+            return queryset
+        tag_ids = get_tag_ids(value)
+        if self.form.cleaned_data.get('tags_mode') != 'all':
+            return queryset.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=tag_ids)))
+        if len(tag_ids) < len(set(value)):
+            return queryset.none()
+        for tag_id in tag_ids:
+            queryset = queryset.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag_id=tag_id)))
+        return queryset
+
+    def skip(self, queryset, name, value):
+        """Параметр только меняет поведение фильтра tags."""
+        return queryset
 
     def get_is_favorited(self, queryset, name, value):
-        return queryset.filter(favorites__user=self.request.user)
+        return self.filter_user_recipes(queryset, Favorite, value)
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        return queryset.filter(shopping_cart__user=self.request.user)
+        return self.filter_user_recipes(queryset, ShoppingCart, value)
+
+    def filter_user_recipes(self, queryset, model, value):
+        """Рецепты, которые пользователь добавил в избранное или корзину."""
+        if not value:
+            return queryset
+        if self.request.user.is_anonymous:
+            return queryset.none()
+        return queryset.filter(Exists(model.objects.filter(
+            user=self.request.user, recipe=OuterRef('pk'))))
+
+    def search_by_text(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию и ингредиентам."""
+        return search_recipes(queryset, value)
+
+    def order_by_score(self, queryset, name, value):
+        """Сортировка по рейтингу, которую обслуживает составной индекс."""
+        return queryset.order_by(f'-{SCORE_ORDERING[value]}', '-pub_date',
+                                 '-id')
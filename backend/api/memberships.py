@@ -0,0 +1,67 @@
+from recipies.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+MEMBERSHIPS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'cart': (ShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+
+
+class Memberships:
+    """Избранное, корзина и подписки текущего пользователя.
+
+    Живет в рамках одного запроса. Идентификаторы объектов из ответа
+    регистрируются заранее, а проверяются одним запросом на каждый вид
+    членства при первом обращении.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.pending = {kind: set() for kind in MEMBERSHIPS}
+        self.checked = {kind: set() for kind in MEMBERSHIPS}
+        self.members = {kind: set() for kind in MEMBERSHIPS}
+
+    @property
+    def is_active(self):
+        return self.user is not None and self.user.is_authenticated
+
+    def register(self, kind, ids):
+        if self.is_active:
+            self.pending[kind].update(set(ids) - self.checked[kind])
+
+    def mark(self, kind, ids):
+        """Запоминает объекты, членство в которых уже известно."""
+        ids = set(ids)
+        self.members[kind] |= ids
+        self.checked[kind] |= ids
+        self.pending[kind] -= ids
+
+    def contains(self, kind, obj_id):
+        if not self.is_active:
+            return False
+        if obj_id not in self.checked[kind]:
+            self.pending[kind].add(obj_id)
+            self.load(kind)
+        return obj_id in self.members[kind]
+
+    def load(self, kind):
+        model, field = MEMBERSHIPS[kind]
+        ids = self.pending[kind]
+        self.members[kind].update(
+            model.objects
+            .filter(user=self.user, **{f'{field}__in': ids})
+            .values_list(field, flat=True)
+        )
+        self.checked[kind] |= ids
+        self.pending[kind] = set()
+
+
+def get_memberships(context):
+    """Memberships запроса из контекста сериализатора."""
+    request = context.get('request')
+    if request is None:
+        return Memberships(None)
+    if not hasattr(request, 'memberships'):
+        request.memberships = Memberships(request.user)
+    return request.memberships
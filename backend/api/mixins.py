@@ -0,0 +1,28 @@
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class CatalogCacheMixin:
+    """Отдает список справочника из кеша процесса с ETag и Last-Modified."""
+
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        key = request.query_params.urlencode()
+        entry = self.catalog.get(key)
+        cache_status = 'HIT'
+        if entry is None:
+            version = self.catalog.version
+            data = super().list(request, *args, **kwargs).data
+            entry = self.catalog.set(key, data, version)
+            cache_status = 'MISS'
+        response = get_conditional_response(
+            request, etag=entry.etag, last_modified=int(entry.last_modified))
+        if response is None:
+            response = Response(entry.data)
+        response['ETag'] = entry.etag
+        response['Last-Modified'] = http_date(entry.last_modified)
+        response['X-Cache'] = cache_status
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
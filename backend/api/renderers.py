@@ -0,0 +1,109 @@
+import csv
+import json
+from io import TextIOWrapper
+from tempfile import SpooledTemporaryFile
+
+from constants import DEJAVUSANS_PATH, SHOPPING_LIST_SPOOL_SIZE
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+pdfmetrics.registerFont(TTFont('DejaVuSans', DEJAVUSANS_PATH))
+
+HEADER = ('Ингредиент', 'Единицы изменения', 'Количество')
+
+
+def shopping_list_rows(ingredients):
+    for item in ingredients:
+        yield (item['ingredient__name'], item['ingredient__measurement_unit'],
+               item['total'])
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Документ пишется во временный файл: пока он меньше
+    SHOPPING_LIST_SPOOL_SIZE, файл хранится в памяти.
+    """
+
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.render_file(data).read()
+
+    def render_file(self, ingredients):
+        file = SpooledTemporaryFile(max_size=SHOPPING_LIST_SPOOL_SIZE)
+        self.write(ingredients, file)
+        file.seek(0)
+        return file
+
+    def write(self, ingredients, file):
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    """Базовый рендерер текстовых форматов в кодировке UTF-8."""
+
+    charset = 'utf-8'
+
+    def write(self, ingredients, file):
+        text = TextIOWrapper(file, encoding=self.charset, newline='')
+        self.write_text(ingredients, text)
+        text.flush()
+        text.detach()
+
+    def write_text(self, ingredients, text):
+        raise NotImplementedError
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+    def write(self, ingredients, file):
+        rows = [HEADER, *shopping_list_rows(ingredients)]
+        style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans')
+        ])
+        SimpleDocTemplate(file).build([Table(rows, style=style)])
+
+
+class ShoppingListCSVRenderer(ShoppingListTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def write_text(self, ingredients, text):
+        writer = csv.writer(text)
+        writer.writerow(HEADER)
+        writer.writerows(shopping_list_rows(ingredients))
+
+
+class ShoppingListPlainTextRenderer(ShoppingListTextRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def write_text(self, ingredients, text):
+        for name, unit, amount in shopping_list_rows(ingredients):
+            text.write(f'{name} ({unit}) — {amount}\n')
+
+
+class ShoppingListJSONRenderer(ShoppingListTextRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def write_text(self, ingredients, text):
+        json.dump(
+            [{'name': name, 'measurement_unit': unit, 'amount': amount}
+             for name, unit, amount in shopping_list_rows(ingredients)],
+            text, cls=JSONEncoder, ensure_ascii=False)
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListPDFRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListPlainTextRenderer,
+    ShoppingListJSONRenderer,
+)
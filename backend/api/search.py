@@ -0,0 +1,245 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock, local
+
+from constants import (INGREDIENT_INDEX_TTL, RECIPE_SEARCH_INDEX_TTL,
+                       SEARCH_BATCH_SIZE, SEARCH_CONFIG)
+from django.db import connection, transaction
+from django.db.models import (BooleanField, Case, FloatField, IntegerField,
+                              Value, When)
+from django.db.models.expressions import RawSQL
+from recipies.documents import tokenize, update_search_documents
+from recipies.models import Ingredient, Recipe
+
+RECIPE_SEARCH_VECTOR = (f"to_tsvector('{SEARCH_CONFIG}', "
+                        '"recipies_recipe"."search_document")')
+RECIPE_SEARCH_QUERY = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+
+changed_documents = local()
+
+
+class IngredientPrefixIndex:
+    """Отсортированный по названию индекс ингредиентов в памяти процесса.
+
+    Используется вместо pg_trgm, когда база данных не Postgres.
+    Перестраивается после изменения ингредиентов в этом процессе
+    и не реже раза в INGREDIENT_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = []
+        self.built_at = None
+        self.lock = Lock()
+
+    def invalidate(self):
+        self.built_at = None
+
+    def build(self):
+        rows = sorted(
+            (name.lower(), pk)
+            for pk, name in Ingredient.objects.values_list('pk', 'name')
+        )
+        self.names = [name for name, _ in rows]
+        self.ids = [pk for _, pk in rows]
+        self.built_at = time.monotonic()
+
+    def ensure_built(self):
+        with self.lock:
+            expired = (self.built_at is None or time.monotonic()
+                       - self.built_at > INGREDIENT_INDEX_TTL)
+            if expired:
+                self.build()
+
+    def search(self, value, limit):
+        """id ингредиентов: сначала совпадения с начала названия."""
+        self.ensure_built()
+        names, ids = self.names, self.ids
+        value = value.lower()
+        found = []
+        position = bisect_left(names, value)
+        while (position < len(names) and len(found) < limit
+               and names[position].startswith(value)):
+            found.append(ids[position])
+            position += 1
+        if len(found) < limit:
+            found.extend(
+                pk for name, pk in zip(names, ids)
+                if value in name and not name.startswith(value)
+            )
+        return found[:limit]
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+def search_ingredients(queryset, value, limit):
+    """Ингредиенты, подходящие под value: сначала по началу названия."""
+    if connection.vendor == 'postgresql':
+        return (
+            queryset
+            .filter(name__icontains=value)
+            .annotate(substring=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField()))
+            .order_by('substring', 'name')
+        )
+    ids = ingredient_index.search(value, limit)
+    return queryset.filter(pk__in=ids).order_by(
+        Case(*(When(pk=pk, then=Value(position))
+               for position, pk in enumerate(ids)),
+             output_field=IntegerField())
+    )
+
+
+class RecipeSearchIndex:
+    """Инвертированный индекс поисковых документов рецептов в памяти.
+
+    Используется вместо полнотекстового индекса Postgres. Документы
+    рецептов, измененных в этом процессе, обновляются сразу, полная
+    перестройка выполняется не реже раза в RECIPE_SEARCH_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.terms = {}
+        self.vocabulary = None
+        self.built_at = None
+        self.lock = Lock()
+
+    def invalidate(self):
+        self.built_at = None
+
+    def add(self, recipe_id, document):
+        counts = defaultdict(int)
+        for term in tokenize(document):
+            counts[term] += 1
+        self.terms[recipe_id] = counts
+        for term, count in counts.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self.vocabulary = None
+            self.postings[term][recipe_id] = count
+
+    def remove(self, recipe_id):
+        for term in self.terms.pop(recipe_id, ()):
+            postings = self.postings[term]
+            del postings[recipe_id]
+            if not postings:
+                del self.postings[term]
+                self.vocabulary = None
+
+    def build(self):
+        self.postings = {}
+        self.terms = {}
+        self.vocabulary = None
+        documents = Recipe.objects.values_list('pk', 'search_document')
+        for recipe_id, document in documents.iterator(
+                chunk_size=SEARCH_BATCH_SIZE):
+            self.add(recipe_id, document)
+        self.built_at = time.monotonic()
+
+    def ensure_built(self):
+        with self.lock:
+            expired = (self.built_at is None or time.monotonic()
+                       - self.built_at > RECIPE_SEARCH_INDEX_TTL)
+            if expired:
+                self.build()
+
+    def update(self, documents):
+        """Заменяет документы {id рецепта: документ} в построенном индексе."""
+        with self.lock:
+            if self.built_at is None:
+                return
+            for recipe_id, document in documents.items():
+                self.remove(recipe_id)
+                self.add(recipe_id, document)
+
+    def discard(self, recipe_ids):
+        with self.lock:
+            for recipe_id in recipe_ids:
+                self.remove(recipe_id)
+
+    def expand(self, token):
+        """Слова словаря, начинающиеся с token."""
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        vocabulary = self.vocabulary
+        position = bisect_left(vocabulary, token)
+        while (position < len(vocabulary)
+               and vocabulary[position].startswith(token)):
+            yield vocabulary[position]
+            position += 1
+
+    def search(self, value):
+        """Ранги рецептов, в которых есть все слова запроса.
+
+        Слово запроса совпадает со словами документа, которые с него
+        начинаются. Ранг равен числу совпавших слов в документе.
+        """
+        self.ensure_built()
+        ranks = None
+        with self.lock:
+            for token in set(tokenize(value)):
+                matches = defaultdict(int)
+                for term in self.expand(token):
+                    for recipe_id, count in self.postings[term].items():
+                        if ranks is None or recipe_id in ranks:
+                            matches[recipe_id] += count
+                if ranks is not None:
+                    for recipe_id, count in matches.items():
+                        matches[recipe_id] = count + ranks[recipe_id]
+                ranks = matches
+                if not ranks:
+                    break
+        return ranks or {}
+
+
+recipe_index = RecipeSearchIndex()
+
+
+def search_recipes(queryset, value):
+    """Рецепты, подходящие под запрос, от более релевантных к менее."""
+    if connection.vendor == 'postgresql':
+        queryset = queryset.filter(RawSQL(
+            f'{RECIPE_SEARCH_VECTOR} @@ {RECIPE_SEARCH_QUERY}', (value,),
+            output_field=BooleanField())
+        ).annotate(search_rank=RawSQL(
+            f'ts_rank({RECIPE_SEARCH_VECTOR}, {RECIPE_SEARCH_QUERY})',
+            (value,), output_field=FloatField()))
+    else:
+        ranks = recipe_index.search(value)
+        if not ranks:
+            return queryset.none()
+        ids_by_rank = defaultdict(list)
+        for recipe_id, rank in ranks.items():
+            ids_by_rank[rank].append(recipe_id)
+        queryset = queryset.filter(pk__in=ranks).annotate(search_rank=Case(
+            *(When(pk__in=recipe_ids, then=Value(rank))
+              for rank, recipe_ids in ids_by_rank.items()),
+            output_field=FloatField()))
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+
+def mark_search_documents(recipe_ids):
+    """Обновляет поисковые документы рецептов после коммита.
+
+    Изменения многих строк в одной транзакции пересобирают каждый
+    документ один раз.
+    """
+    if not hasattr(changed_documents, 'ids'):
+        changed_documents.ids = set()
+    changed_documents.ids.update(recipe_ids)
+    transaction.on_commit(flush_search_documents)
+
+
+def flush_search_documents():
+    recipe_ids = sorted(getattr(changed_documents, 'ids', ()))
+    if not recipe_ids:
+        return
+    changed_documents.ids = set()
+    for start in range(0, len(recipe_ids), SEARCH_BATCH_SIZE):
+        recipe_index.update(update_search_documents(
+            recipe_ids[start:start + SEARCH_BATCH_SIZE]))
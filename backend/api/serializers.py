@@ -1,11 +1,31 @@
-from django.shortcuts import get_object_or_404
+import json
+
+from constants import BULK_MAX_RECIPES
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipies.models import (Ingredient, IngridientInRecipe, Recipe,
-                             Tag, Favorite, ShoppingCart)
+from recipies.images import get_variant_names
+from recipies.models import Ingredient, IngridientInRecipe, Recipe, Tag
+from recipies.tasks import (process_pending_image, store_pending_image,
+                            submit)
 from rest_framework import serializers
+from rest_framework.utils import html
 from users.models import CustomUser, Subscription
 
+from .memberships import get_memberships
+
+
+class MembershipListSerializer(serializers.ListSerializer):
+    """Регистрирует объекты страницы в Memberships до сериализации."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        self.child.register_memberships(get_memberships(self.context), items)
+        return super().to_representation(items)
+
 
 class CustomUserSerializer(UserSerializer):
     """Сериализатор для модели пользователя"""
@@ -16,12 +36,13 @@ class CustomUserSerializer(UserSerializer):
         model = CustomUser
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed')
+        list_serializer_class = MembershipListSerializer
+
+    def register_memberships(self, memberships, users):
+        memberships.register('subscriptions', [user.id for user in users])
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Subscription.objects.filter(user=user, author=obj.id).exists()
+        return get_memberships(self.context).contains('subscriptions', obj.id)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -37,6 +58,16 @@ class PasswordSerializer(serializers.Serializer):
     new_password = serializers.CharField(required=True)
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления"""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_RECIPES
+    )
+
+
 class IngridientsSerializer(serializers.ModelSerializer):
     """Сериализатор модели ингредиента"""
 
@@ -67,6 +98,37 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class ImageVariantsField(serializers.Field):
+    """Ссылки на уменьшенные копии изображения рецепта.
+
+    Пока копии не созданы, возвращается None.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        image = recipe.image
+        if (not image or not recipe.image_variants_ready
+                or recipe.image_status != Recipe.ImageStatus.READY):
+            return None
+        request = self.context.get('request')
+        return {
+            variant: {
+                extension: self.build_url(image.storage.url(name), request)
+                for extension, name in names.items()
+            }
+            for variant, names in get_variant_names(image.name).items()
+        }
+
+    def build_url(self, url, request):
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+
 class RecipeShowSerializer(serializers.ModelSerializer):
     """Cериализатор просмотора рецепта"""
 
@@ -77,25 +139,41 @@ class RecipeShowSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'image_variants',
+                  'image_status', 'text', 'cooking_time', 'favorites_count',
+                  'in_carts_count')
+        read_only_fields = ('favorites_count', 'in_carts_count')
+        list_serializer_class = MembershipListSerializer
+
+    def register_memberships(self, memberships, recipes):
+        recipe_ids = [recipe.id for recipe in recipes]
+        memberships.register('favorites', recipe_ids)
+        memberships.register('cart', recipe_ids)
+        memberships.register('subscriptions',
+                             [recipe.author_id for recipe in recipes])
 
     def get_is_favorited(self, obj):
-        return self.obj_exists(obj, Favorite)
+        return get_memberships(self.context).contains('favorites', obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        return self.obj_exists(obj, ShoppingCart)
+        return get_memberships(self.context).contains('cart', obj.id)
 
-    def obj_exists(self, recipe, name_class):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return name_class.objects.filter(user=request.user,
-                                         recipe=recipe).exists()
+
+class PantryRecipeSerializer(RecipeShowSerializer):
+    """Рецепт с долей ингредиентов, которые есть у пользователя."""
+
+    coverage = serializers.FloatField(read_only=True)
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeShowSerializer.Meta):
+        fields = RecipeShowSerializer.Meta.fields + (
+            'coverage', 'matched_count', 'missing_count')
 
 
 class IngredientInRecipeCreateSerializer(serializers.ModelSerializer):
@@ -109,20 +187,58 @@ class IngredientInRecipeCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
+class TagIdsField(serializers.ListField):
+    """Список id тегов рецепта"""
+
+    child = serializers.IntegerField()
+
+    def to_representation(self, tags):
+        return [tag.id for tag in tags.all()]
+
+
+class PendingImageField(serializers.CharField):
+    """Изображение, которое обрабатывается в фоне после сохранения.
+
+    Принимает строку base64 или файл из multipart-запроса.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('trim_whitespace', False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return data
+        data = super().to_internal_value(data)
+        if len(data) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Размер изображения не должен превышать '
+                f'{settings.RECIPE_IMAGE_MAX_SIZE} байт')
+        return data
+
+    def to_representation(self, image):
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return image.url
+        return request.build_absolute_uri(image.url)
+
+
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Cериализатор создания рецепта"""
 
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientInRecipeCreateSerializer(
         many=True, source='ingredients_in_recipe')
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
-    image = Base64ImageField()
+    tags = TagIdsField()
+    image = PendingImageField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'author', 'ingredients', 'tags', 'image', 'name',
-                  'text', 'cooking_time')
+        fields = ('id', 'author', 'ingredients', 'tags', 'image',
+                  'image_status', 'name', 'text', 'cooking_time')
+        read_only_fields = ('image_status',)
 
     def validate_ingredients(self, ingredients):
         if not ingredients:
@@ -131,7 +247,11 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         for ingredient in ingredients:
             self.validate_unique_ingredient(ingredient['id'], ingredients_set)
             self.validate_amount(ingredient['amount'])
-
+        missing = ingredients_set - Ingredient.objects.in_bulk(
+            ingredients_set).keys()
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиентов с id {sorted(missing)} не существует')
         return ingredients
 
     def validate_unique_ingredient(self, ingredient_id, ingredients_set):
@@ -144,74 +264,115 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Количество ингредиента не может'
                                               'быть меньше единицы!')
 
+    def validate_tags(self, tag_ids):
+        tags = Tag.objects.in_bulk(tag_ids)
+        missing = set(tag_ids) - tags.keys()
+        if missing:
+            raise serializers.ValidationError(
+                f'Тегов с id {sorted(missing)} не существует')
+        return list(tags.values())
+
     def get_ingredients(self, obj):
         ingredients = IngridientInRecipe.objects.filter(recipe=obj)
         return IngredientInRecipeSerializer(ingredients).data
 
-    def add_recipe_ingredients(self, ingredients, recipe):
+    def set_recipe_ingredients(self, ingredients, recipe):
+        """Приводит ингредиенты рецепта к переданному списку.
+
+        Новые строки добавляются одним bulk_create, измененные количества
+        сохраняются одним bulk_update, лишние строки удаляются одним delete.
+        """
+        existing = {item.ingredient_id: item
+                    for item in IngridientInRecipe.objects.filter(
+                        recipe=recipe)}
+        new_items = []
+        changed_items = []
         for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            amount = ingredient['amount']
-            IngridientInRecipe.objects.update_or_create(
-                recipe=recipe, ingredient=ingredient_id,
-                defaults={'amount': amount})
-
+            item = existing.pop(ingredient['id'], None)
+            if item is None:
+                new_items.append(IngridientInRecipe(
+                    recipe=recipe,
+                    ingredient_id=ingredient['id'],
+                    amount=ingredient['amount']))
+            elif item.amount != ingredient['amount']:
+                item.amount = ingredient['amount']
+                changed_items.append(item)
+        IngridientInRecipe.objects.bulk_create(new_items)
+        IngridientInRecipe.objects.bulk_update(changed_items, ['amount'])
+        if existing:
+            IngridientInRecipe.objects.filter(
+                pk__in=[item.pk for item in existing.values()]).delete()
+
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self.parse_form_data(data)
+        return super().to_internal_value(data)
+
+    def parse_form_data(self, data):
+        """Поля multipart-запроса: списки передаются строками JSON."""
+        parsed = data.dict()
+        for field in ('ingredients', 'tags'):
+            if field not in parsed:
+                continue
+            try:
+                parsed[field] = json.loads(parsed[field])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {field: ['Ожидается список в формате JSON']})
+        return parsed
+
+    def submit_image(self, recipe):
+        """Передает сохраненное изображение в пул обработки после коммита.
+
+        Если процесс завершится раньше, изображение обработает команда
+        process_pending_images.
+        """
+        transaction.on_commit(
+            lambda: submit(process_pending_image, recipe.pk))
+
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients_data = validated_data.pop('ingredients_in_recipe')
+        ingredients = validated_data.pop('ingredients_in_recipe')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
+        image = validated_data.pop('image')
+        recipe = Recipe.objects.create(
+            image_status=Recipe.ImageStatus.PENDING,
+            pending_image=store_pending_image(image), **validated_data)
+        self.submit_image(recipe)
         recipe.tags.set(tags)
-        ingredients_in_recipe = []
-        for ingredient in ingredients_data:
-            id = ingredient.get('id')
-            amount = ingredient.get('amount')
-            ingredient_instance, created = Ingredient.objects.get_or_create(
-                id=id)
-            ingredients_in_recipe.append(IngridientInRecipe(
-                recipe=recipe,
-                ingredient=ingredient_instance,
-                amount=amount))
-        IngridientInRecipe.objects.bulk_create(ingredients_in_recipe)
-        recipe.save()
+        IngridientInRecipe.objects.bulk_create(
+            IngridientInRecipe(recipe=recipe,
+                               ingredient_id=ingredient['id'],
+                               amount=ingredient['amount'])
+            for ingredient in ingredients
+        )
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
-        )
-        tags_data = validated_data.pop('tags')
-        ingredients_data = validated_data.pop('ingredients_in_recipe')
-        new_tags = []
-        for item in tags_data:
-            tag = get_object_or_404(Tag, id=item.id)
-            new_tags.append(tag)
-        instance.tags.set(new_tags)
-        new_ingredients = []
-        for item in ingredients_data:
-            amount = item.get('amount')
-            ingredient = get_object_or_404(Ingredient, id=item.get('id'))
-            new_ingredients.append(
-                ingredient
-            )
-        instance.ingredients.set(
-            new_ingredients,
-            through_defaults={'amount': amount}
-        )
-
-        instance.save()
-        return instance
+        ingredients = validated_data.pop('ingredients_in_recipe', None)
+        tags = validated_data.pop('tags', None)
+        image = validated_data.pop('image', None)
+        if image is not None:
+            instance.image_status = Recipe.ImageStatus.PENDING
+            instance.pending_image = store_pending_image(image)
+            self.submit_image(instance)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.set_recipe_ingredients(ingredients, instance)
+        return super().update(instance, validated_data)
 
 
 class HelpCreateSerializer(serializers.ModelSerializer):
     """ Сериализатор для создания объекта в
     FavoriteSerializer, SubscriptionSerializer, ShoppingCartSerializer """
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class UserSubscriptionSerializer(serializers.ModelSerializer):
@@ -225,6 +386,7 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count')
+        list_serializer_class = MembershipListSerializer
 
     def validate(self, data):
         user = self.context['request'].user
@@ -236,19 +398,21 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f'Вы уже подписаны на {author}')
         return data
 
+    def register_memberships(self, memberships, users):
+        memberships.register('subscriptions', [user.id for user in users])
+
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Subscription.objects.filter(user=user, author=obj.id).exists()
+        return get_memberships(self.context).contains('subscriptions', obj.id)
 
     def get_recipes(self, obj):
         request = self.context.get('request')
         recipes = obj.recipes.all()
         recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
+        if recipes_limit and recipes_limit.isdigit():
             recipes = recipes[:int(recipes_limit)]
         return HelpCreateSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj).count()
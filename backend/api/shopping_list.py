@@ -0,0 +1,28 @@
+from django.db.models import Sum
+from recipies.models import IngridientInRecipe
+from recipies.units import (base_amount_expression, base_unit_expression,
+                            spelling_expression, to_display)
+
+
+def get_shopping_list(user):
+    """Суммарное количество ингредиентов из корзины одним запросом.
+
+    Количества в переводимых единицах (г и кг, мл и л) суммируются
+    в базовой единице и показываются в самой крупной подходящей.
+    Остальные единицы выводятся отдельными строками.
+    """
+    ingredients = (
+        IngridientInRecipe.objects
+        .filter(recipe__shopping_cart__user=user)
+        .annotate(spelling=spelling_expression(
+            'ingredient__measurement_unit'))
+        .annotate(unit=base_unit_expression('spelling'))
+        .values('ingredient__name', 'unit')
+        .annotate(total=Sum(base_amount_expression('amount', 'spelling')))
+        .order_by('ingredient__name', 'unit')
+    )
+    for item in ingredients.iterator():
+        total, unit = to_display(item['total'], item['unit'])
+        yield {'ingredient__name': item['ingredient__name'],
+               'ingredient__measurement_unit': unit,
+               'total': total}
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipies.images import has_image_variants
+from recipies.models import (Favorite, Ingredient, IngridientInRecipe,
+                             Recipe, RecipeTag, ShoppingCart, Tag)
+from recipies.signals import recipe_image_processed
+from recipies.tasks import process_image_variants, submit
+from users.models import CustomUser, Subscription
+
+from .cache import (ingredient_catalog, invalidate_author_feeds,
+                    invalidate_feeds, invalidate_recipe_shopping_lists,
+                    invalidate_shopping_lists, recipe_detail_cache,
+                    tag_catalog, touch_recipe)
+from .search import ingredient_index, mark_search_documents, recipe_index
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    invalidate_shopping_lists([instance.user_id])
+    invalidate_feeds([instance.user_id])
+    recipe_detail_cache.invalidate([instance.recipe_id])
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(sender, instance, **kwargs):
+    invalidate_feeds([instance.user_id])
+    recipe_detail_cache.invalidate([instance.recipe_id])
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    invalidate_feeds([instance.user_id])
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_recipe_shopping_lists(instance.pk)
+        recipe_detail_cache.invalidate([instance.pk])
+    invalidate_author_feeds(instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_document_changed(sender, instance, **kwargs):
+    mark_search_documents([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_document_deleted(sender, instance, **kwargs):
+    recipe_index.discard([instance.pk])
+
+
+@receiver(recipe_image_processed)
+def recipe_image_processed_changed(sender, recipe_id, **kwargs):
+    recipe_detail_cache.invalidate([recipe_id])
+    author_id = (Recipe.objects.filter(pk=recipe_id)
+                 .values_list('author_id', flat=True).first())
+    if author_id is not None:
+        invalidate_author_feeds(author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    if instance.image and not has_image_variants(instance.image):
+        Recipe.objects.filter(pk=instance.pk).update(
+            image_variants_ready=False)
+        transaction.on_commit(
+            lambda: submit(process_image_variants, instance.pk))
+
+
+@receiver((post_save, post_delete), sender=IngridientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    touch_recipe(instance.recipe_id)
+    invalidate_recipe_shopping_lists(instance.recipe_id)
+    recipe_detail_cache.invalidate([instance.recipe_id])
+    mark_search_documents([instance.recipe_id])
+
+
+@receiver((post_save, post_delete), sender=RecipeTag)
+def recipe_tag_changed(sender, instance, **kwargs):
+    recipe_detail_cache.invalidate([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipe_detail_cache.invalidate([instance.pk])
+    elif pk_set:
+        recipe_detail_cache.invalidate(pk_set)
+    else:
+        recipe_detail_cache.clear()
+
+
+@receiver(post_save, sender=CustomUser)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    recipe_detail_cache.invalidate(
+        Recipe.objects.filter(author=instance).values_list('pk', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    ingredient_index.invalidate()
+    ingredient_catalog.bump()
+    recipe_detail_cache.clear()
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        mark_search_documents(
+            IngridientInRecipe.objects.filter(ingredient=instance)
+            .values_list('recipe_id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    tag_catalog.bump()
+    recipe_detail_cache.clear()
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from recipies.images import is_image_header
+from rest_framework.exceptions import ValidationError
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загружаемое изображение во временный файл по частям.
+
+    Сигнатура формата проверяется по первой части файла, а загрузка
+    прерывается, как только размер превысит RECIPE_IMAGE_MAX_SIZE.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not is_image_header(raw_data):
+            self.reject('Загрузите корректное изображение')
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.reject('Размер изображения не должен превышать '
+                        f'{settings.RECIPE_IMAGE_MAX_SIZE} байт')
+        return super().receive_data_chunk(raw_data, start)
+
+    def reject(self, message):
+        self.file.close()
+        raise ValidationError({self.field_name: [message]})
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from api.views import (CustomUserViewSet, IngredientsViewSet, RecipeViewSet,
-                       TagViewSet)
+from api.views import (CacheStatsView, CustomUserViewSet, IngredientsViewSet,
+                       QueryStatsView, RecipeViewSet, TagViewSet)
 
 router = DefaultRouter()
 
@@ -12,6 +12,8 @@ router.register(r'recipes', RecipeViewSet, basename='recipes')
 
 
 urlpatterns = [
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('query-stats/', QueryStatsView.as_view(), name='query-stats'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
@@ -1,29 +1,63 @@
-from constants import DEJAVUSANS_PATH
-from django.http import HttpResponse
+import time
+from io import SEEK_END, BytesIO
+
+from backend.profiling import query_profile
+from constants import (INGREDIENT_SEARCH_LIMIT, PANTRY_MAX_INGREDIENTS,
+                       SHOPPING_LIST_SPOOL_SIZE)
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipies.models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
-                             ShoppingCart, Tag)
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from recipies.counters import change_counter
+from recipies.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipies.pantry import rank_by_pantry
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import (AllowAny, IsAuthenticated)
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from users.models import CustomUser, Subscription
 
 from api.serializers import (CustomUserSerializer, HelpCreateSerializer,
-                             IngridientsSerializer, PasswordSerializer,
-                             RecipeCreateSerializer, RecipeShowSerializer,
+                             IngridientsSerializer, PantryRecipeSerializer,
+                             PasswordSerializer, RecipeCreateSerializer,
+                             RecipeIdsSerializer, RecipeShowSerializer,
                              TagSerializer, UserSubscriptionSerializer)
 
+from .cache import (CATALOG_CACHES, get_cached_feed,
+                    get_cached_shopping_list, get_shopping_list_etag,
+                    ingredient_catalog, invalidate_feeds,
+                    invalidate_shopping_lists, recipe_detail_cache,
+                    set_cached_feed, set_cached_shopping_list, tag_catalog)
 from .filters import IngredientFilter, RecipeFilter
+from .memberships import get_memberships
+from .mixins import CatalogCacheMixin
+from .pagination import FeedPagination, RecipePagination
 from .permissions import IsOwnerOrAdminOrReadOnly
+from .renderers import SHOPPING_LIST_RENDERERS
+from .shopping_list import get_shopping_list
+from .upload_handlers import RecipeImageUploadHandler
+
 
-pdfmetrics.registerFont(TTFont('DejaVuSans', DEJAVUSANS_PATH))
+def get_latest_recipes(recipes_limit):
+    """Последние recipes_limit рецептов каждого автора одним запросом."""
+    recipes = Recipe.objects.order_by('-pub_date', '-id')
+    if recipes_limit is None or not recipes_limit.isdigit():
+        return recipes
+    latest = (
+        Recipe.objects
+        .filter(author=OuterRef('author'))
+        .order_by('-pub_date', '-id')
+        .values('pk')[:int(recipes_limit)]
+    )
+    return recipes.filter(pk__in=Subquery(latest))
 
 
 class CustomUserViewSet(UserViewSet):
@@ -46,16 +80,26 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscriptions(self, request):
-        queryset = CustomUser.objects.filter(
-            subscribed_author__user=request.user)
-        if queryset:
-            pages = self.paginate_queryset(queryset)
-            serializer = UserSubscriptionSerializer(pages, many=True,
-                                                    context={'request':
-                                                             request})
-            return self.get_paginated_response(serializer.data)
-        return Response('У вас нет подписок',
-                        status=status.HTTP_400_BAD_REQUEST)
+        queryset = (
+            CustomUser.objects
+            .filter(subscribed_author__user=request.user)
+            .annotate(recipes_count=Count('recipes'))
+            .order_by('id')
+            .prefetch_related(Prefetch(
+                'recipes',
+                queryset=get_latest_recipes(
+                    request.query_params.get('recipes_limit'))
+            ))
+        )
+        pages = self.paginate_queryset(queryset)
+        if not pages:
+            return Response('У вас нет подписок',
+                            status=status.HTTP_400_BAD_REQUEST)
+        get_memberships({'request': request}).mark(
+            'subscriptions', [author.id for author in pages])
+        serializer = UserSubscriptionSerializer(pages, many=True,
+                                                context={'request': request})
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=True,
@@ -106,7 +150,8 @@ class CustomUserViewSet(UserViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    catalog = ingredient_catalog
     queryset = Ingredient.objects.all()
     serializer_class = IngridientsSerializer
     permission_classes = (AllowAny,)
@@ -115,32 +160,92 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     search_fields = ('name',)
     pagination_class = None
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.request.query_params.get('name'):
+            return queryset[:INGREDIENT_SEARCH_LIMIT]
+        return queryset
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    catalog = tag_catalog
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
+class CacheStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({cache.name: cache.as_dict()
+                         for cache in (*CATALOG_CACHES, recipe_detail_cache)})
+
+
+class QueryStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(query_profile.as_dict())
+
+    def delete(self, request):
+        query_profile.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Recipe.objects
-        .select_related('author')
-        .prefetch_related('tags', 'ingredients_in_recipe')
-    )
+    queryset = Recipe.objects.prefetch_related(
+        'tags', 'ingredients_in_recipe__ingredient')
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = PageNumberPagination
+    pagination_class = RecipePagination
+    parser_classes = (JSONParser, MultiPartParser)
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [RecipeImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        if 'is_favorited' in self.request.query_params:
-            qs = qs.filter(favorites__user=self.request.user)
-        if 'is_in_shopping_cart' in self.request.query_params:
-            qs = qs.filter(shopping_cart__user=self.request.user)
-        return qs
+        if self.request.method not in SAFE_METHODS:
+            return Recipe.objects.all()
+        return super().get_queryset().select_related('author')
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт из кеша с флагами текущего пользователя."""
+        start = time.perf_counter()
+        recipe_id = kwargs[self.lookup_field]
+        data = None
+        if recipe_id.isdigit():
+            data = recipe_detail_cache.get(int(recipe_id))
+        hit = data is not None
+        if not hit:
+            recipe = self.get_object()
+            data = RecipeShowSerializer(recipe).data
+            recipe_detail_cache.set(recipe.pk, data)
+        response = Response(self.add_user_data(data))
+        recipe_detail_cache.stats.record(hit, time.perf_counter() - start)
+        return response
+
+    def add_user_data(self, data):
+        """Флаги пользователя и абсолютные ссылки для ответа из кеша."""
+        memberships = get_memberships({'request': self.request})
+        data['is_favorited'] = memberships.contains('favorites', data['id'])
+        data['is_in_shopping_cart'] = memberships.contains('cart',
+                                                           data['id'])
+        data['author']['is_subscribed'] = memberships.contains(
+            'subscriptions', data['author']['id'])
+        build_url = self.request.build_absolute_uri
+        if data['image']:
+            data['image'] = build_url(data['image'])
+        if data['image_variants']:
+            data['image_variants'] = {
+                variant: {extension: build_url(url)
+                          for extension, url in urls.items()}
+                for variant, urls in data['image_variants'].items()
+            }
+        return data
 
     def get_serializer_class(self):
         if self.request.method == 'POST' or self.request.method == 'PATCH':
@@ -163,9 +268,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if user.is_anonymous:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
         recipe = get_object_or_404(Recipe, pk=pk)
+        recipes = Recipe.objects.filter(pk=recipe.pk)
         if request.method == 'POST':
-            favorite, created = Favorite.objects.get_or_create(
-                user=user, recipe=recipe)
+            with transaction.atomic():
+                favorite, created = Favorite.objects.get_or_create(
+                    user=user, recipe=recipe)
+                if created:
+                    change_counter(recipes, 'favorites_count', 1)
             if created:
                 serializer = HelpCreateSerializer(favorite.recipe)
                 return Response(
@@ -174,9 +283,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 )
             return Response(status=status.HTTP_400_BAD_REQUEST)
         elif request.method == 'DELETE':
-            favorites = Favorite.objects.filter(user=user,
-                                                recipe=recipe).delete()
-            if favorites[0] == 0:
+            with transaction.atomic():
+                deleted, _ = Favorite.objects.filter(user=user,
+                                                     recipe=recipe).delete()
+                if deleted:
+                    change_counter(recipes, 'favorites_count', -1)
+            if deleted == 0:
                 data = {'errors': 'Такого рецепта нет в избранных.'}
                 return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -190,9 +302,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk=None):
         user = request.user
         recipe = get_object_or_404(Recipe, id=pk)
+        recipes = Recipe.objects.filter(pk=recipe.pk)
         if request.method == 'POST':
-            shopping_cart, created = ShoppingCart.objects.get_or_create(
-                user=user, recipe=recipe)
+            with transaction.atomic():
+                shopping_cart, created = ShoppingCart.objects.get_or_create(
+                    user=user, recipe=recipe)
+                if created:
+                    change_counter(recipes, 'in_carts_count', 1)
             if created:
                 serializer = HelpCreateSerializer(shopping_cart.recipe)
                 return Response(serializer.data,
@@ -200,47 +316,174 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(data='Рецепт уже добавлен в корзину',
                             status=status.HTTP_400_BAD_REQUEST)
         elif request.method == 'DELETE':
-            shopping_cart = ShoppingCart.objects.filter(user=user,
-                                                        recipe=recipe)
-            if shopping_cart.exists():
-                shopping_cart.delete()
+            with transaction.atomic():
+                deleted, _ = ShoppingCart.objects.filter(
+                    user=user, recipe=recipe).delete()
+                if deleted:
+                    change_counter(recipes, 'in_carts_count', -1)
+            if deleted:
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(data='Этого рецепта нет в списке покупок',
                             status=status.HTTP_404_NOT_FOUND)
 
+    def change_user_recipes(self, request, model, counter):
+        """Добавляет или удаляет рецепты из списка пользователя.
+
+        Число запросов не зависит от количества id в запросе. Для каждого
+        id возвращается статус: added/exists при добавлении,
+        removed/absent при удалении или not_found.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        user = request.user
+        found = set(Recipe.objects.filter(pk__in=recipe_ids)
+                    .values_list('pk', flat=True))
+        adding = request.method == 'POST'
+        with transaction.atomic():
+            present = set(
+                model.objects.filter(user=user, recipe_id__in=found)
+                .values_list('recipe_id', flat=True))
+            if adding:
+                changed = found - present
+                model.objects.bulk_create(
+                    (model(user=user, recipe_id=recipe_id)
+                     for recipe_id in changed),
+                    ignore_conflicts=True)
+            else:
+                changed = present
+                model.objects.filter(user=user,
+                                     recipe_id__in=changed).delete()
+            if changed:
+                change_counter(Recipe.objects.filter(pk__in=changed),
+                               counter, 1 if adding else -1)
+        if adding and changed:
+            # bulk_create не отправляет post_save, кеши сбрасываются здесь.
+            invalidate_feeds([user.id])
+            recipe_detail_cache.invalidate(changed)
+            if model is ShoppingCart:
+                invalidate_shopping_lists([user.id])
+        statuses = ('added', 'exists') if adding else ('removed', 'absent')
+        return Response({'results': [
+            {'id': recipe_id,
+             'status': ('not_found' if recipe_id not in found
+                        else statuses[0] if recipe_id in changed
+                        else statuses[1])}
+            for recipe_id in recipe_ids
+        ]})
+
     @action(
+        methods=['post', 'delete'],
         detail=False,
-        methods=['get'],
+        url_path='favorite',
         permission_classes=(IsAuthenticated,)
     )
+    def favorite_bulk(self, request):
+        """Массовое добавление и удаление рецептов из избранного."""
+        return self.change_user_recipes(request, Favorite, 'favorites_count')
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        """Массовое добавление и удаление рецептов из корзины."""
+        return self.change_user_recipes(request, ShoppingCart,
+                                        'in_carts_count')
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, от новых к старым.
+
+        Первая страница без фильтров кешируется на FEED_CACHE_TTL секунд.
+        Поиск и сортировка по рейтингу меняют порядок, поэтому с курсором
+        ленты несовместимы и отклоняются.
+        """
+        errors = {
+            name: ['Недоступно в ленте подписок']
+            for name in ('search', 'ordering') if name in request.query_params
+        }
+        if errors:
+            raise ValidationError(errors)
+        cacheable = set(request.query_params) <= {
+            self.paginator.page_size_query_param}
+        page_size = self.paginator.get_page_size(request)
+        if cacheable:
+            data = get_cached_feed(request.user, page_size)
+            if data is not None:
+                return Response(data)
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            author__subscribed_author__user=request.user)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        if cacheable:
+            set_cached_feed(request.user, page_size, response.data)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def cook(self, request):
+        """Рецепты из имеющихся ингредиентов ?ingredients=1&ingredients=2.
+
+        Сначала рецепты, для которых есть большая доля ингредиентов.
+        """
+        values = request.query_params.getlist('ingredients')
+        if not values or not all(value.isdigit() for value in values):
+            raise ValidationError(
+                {'ingredients': ['Укажите id имеющихся ингредиентов']})
+        ingredient_ids = {int(value) for value in values}
+        if len(ingredient_ids) > PANTRY_MAX_INGREDIENTS:
+            raise ValidationError({'ingredients': [
+                f'Не больше {PANTRY_MAX_INGREDIENTS} ингредиентов']})
+        queryset = rank_by_pantry(
+            self.filter_queryset(self.get_queryset()), ingredient_ids)
+        page = self.paginate_queryset(queryset)
+        serializer = PantryRecipeSerializer(
+            page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    def handle_exception(self, exc):
+        """Ошибки списка покупок отдаются в JSON, а не в формате файла."""
+        if self.action == 'download_shopping_cart':
+            self.request.accepted_renderer = JSONRenderer()
+            self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
     def download_shopping_cart(self, request):
-        self.response = HttpResponse(content_type='application/pdf')
-        self.response[
-            'Content-Disposition'] = 'attachment; filename="my_recipes.pdf"'
-        queryset = IngridientInRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user)
-        ingredients_dict = {}
-        for item in queryset:
-            if item.ingredient not in ingredients_dict:
-                ingredients_dict[item.ingredient] = (
-                    item.ingredient.measurement_unit, item.amount)
+        renderer = request.accepted_renderer
+        etag = get_shopping_list_etag(request.user, renderer.format)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content = get_cached_shopping_list(request.user, renderer.format,
+                                               etag)
+            if content is None:
+                file = renderer.render_file(get_shopping_list(request.user))
+                if file.seek(0, SEEK_END) <= SHOPPING_LIST_SPOOL_SIZE:
+                    file.seek(0)
+                    set_cached_shopping_list(request.user, renderer.format,
+                                             etag, file.read())
+                file.seek(0)
             else:
-                current_unit, current_amount = ingredients_dict[
-                    item.ingredient]
-                ingredients_dict[item.ingredient] = (
-                    current_unit, current_amount + item.amount)
-
-        ingredients_list = []
-        ingredients_list.append(['Ингредиент',
-                                 'Единицы изменения',
-                                 'Количество'])
-
-        for ing, (unit, amount) in ingredients_dict.items():
-            ingredients_list.append([ing, unit, amount])
-        style = TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'DejaVuSans')
-        ])
-        table = Table(ingredients_list, style=style)
-        doc = SimpleDocTemplate(self.response)
-        doc.build([table])
-        return self.response
+                file = BytesIO(content)
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f'; charset={renderer.charset}'
+            response = FileResponse(file, as_attachment=True,
+                                    filename=f'my_recipes.{renderer.format}',
+                                    content_type=content_type)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
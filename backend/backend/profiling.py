@@ -0,0 +1,205 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from threading import Lock
+
+from constants import (DURATION_BUCKETS_MS, DUPLICATE_QUERY_THRESHOLD,
+                       QUERY_COUNT_BUCKETS, RESPONSE_SIZE_BUCKETS)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERALS = re.compile(r"'[^']*'|\b\d+\b")
+
+
+def get_fingerprint(sql):
+    """SQL без значений: одинаковые запросы с разными параметрами."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    return LITERALS.sub('?', sql)
+
+
+def get_endpoint_name(request):
+    """Имя представления и действия, например RecipeViewSet.list."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return request.path
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        position = next((i for i, bound in enumerate(self.bounds)
+                         if value <= bound), len(self.bounds))
+        self.buckets[position] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        labels = [f'le_{bound}' for bound in self.bounds] + ['inf']
+        return {
+            'mean': self.total / self.count if self.count else None,
+            'max': self.max,
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.duplicates = 0
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_ms = Histogram(DURATION_BUCKETS_MS)
+        self.app_ms = Histogram(DURATION_BUCKETS_MS)
+        self.serialization_ms = Histogram(DURATION_BUCKETS_MS)
+        self.response_bytes = Histogram(RESPONSE_SIZE_BUCKETS)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'duplicate_queries': self.duplicates,
+            'queries': self.queries.as_dict(),
+            'db_ms': self.db_ms.as_dict(),
+            'app_ms': self.app_ms.as_dict(),
+            'serialization_ms': self.serialization_ms.as_dict(),
+            'response_bytes': self.response_bytes.as_dict(),
+        }
+
+
+class QueryProfile:
+    """Статистика эндпоинтов в памяти процесса."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = Lock()
+
+    def record(self, endpoint, recorder, app_ms, serialization_ms, size):
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.duplicates += len(recorder.duplicates())
+            stats.queries.add(recorder.count)
+            stats.db_ms.add(recorder.duration_ms)
+            stats.app_ms.add(app_ms)
+            if serialization_ms is not None:
+                stats.serialization_ms.add(serialization_ms)
+            if size is not None:
+                stats.response_bytes.add(size)
+
+    def as_dict(self):
+        with self.lock:
+            return {endpoint: stats.as_dict()
+                    for endpoint, stats in sorted(self.endpoints.items())}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+query_profile = QueryProfile()
+
+
+class QueryRecorder:
+    """execute_wrapper, который считает запросы и время в БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration_ms += (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.fingerprints[get_fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [(fingerprint, count)
+                for fingerprint, count in self.fingerprints.items()
+                if count >= DUPLICATE_QUERY_THRESHOLD]
+
+
+class QueryProfilingMiddleware:
+    """Профилирование SQL-запросов по эндпоинтам.
+
+    Включается настройкой QUERY_PROFILING_ENABLED и записывает долю
+    QUERY_PROFILING_SAMPLE_RATE запросов. serialization_ms — время
+    response.render(), за которое рендерер превращает данные ответа
+    в JSON, PDF или CSV. Время приложения app_ms — остальное время ответа
+    без БД: middleware и представление вместе с сериализаторами.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.QUERY_PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        request.serialization_ms = None
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        serialization_ms = request.serialization_ms
+        app_ms = max(
+            total_ms - recorder.duration_ms - (serialization_ms or 0), 0)
+        endpoint = get_endpoint_name(request)
+        query_profile.record(endpoint, recorder, app_ms, serialization_ms,
+                             self.get_size(response))
+        for fingerprint, count in recorder.duplicates():
+            logger.warning('Повторяющийся запрос в %s (%d раз): %s',
+                           endpoint, count, fingerprint)
+        timings = [
+            f'db;dur={recorder.duration_ms:.1f};'
+            f'desc="{recorder.count} queries"',
+            f'app;dur={app_ms:.1f}',
+        ]
+        if serialization_ms is not None:
+            timings.append(f'serialization;dur={serialization_ms:.1f}')
+        timings.append(f'total;dur={total_ms:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def process_template_response(self, request, response):
+        """Засекает рендеринг ответа, который Django выполнит следом."""
+        if not hasattr(request, 'serialization_ms'):
+            return response
+        start = time.perf_counter()
+
+        def stop(rendered):
+            request.serialization_ms = (time.perf_counter() - start) * 1000
+
+        response.add_post_render_callback(stop)
+        return response
+
+    def get_size(self, response):
+        if response.streaming:
+            length = response.get('Content-Length')
+            return int(length) if length else None
+        return len(response.content)
@@ -0,0 +1,13 @@
+"""Настройки для запуска тестов на SQLite, без Postgres."""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+IMAGE_TASKS_EAGER = True
@@ -1,6 +1,37 @@
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
 EMPTY_VALUE = '--пусто--'
 MINIMUM_COOKING_TIME = 1
 MINIMUM_AMOUNT = 1
-CSV_PATH = '/app/data/ingredients.csv'
+CSV_PATH = str(BASE_DIR / 'data' / 'ingredients.csv')
 INVALID_SYMBOLS = r'[a-zA-Z0-9.@+-_]'
-DEJAVUSANS_PATH = '/app/DejaVu_Sans/DejaVuSans.ttf'
+DEJAVUSANS_PATH = str(BASE_DIR / 'DejaVuSans.ttf')
+SHOPPING_LIST_SPOOL_SIZE = 1024 * 1024
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+IMPORT_BATCH_SIZE = 1000
+INGREDIENT_INDEX_TTL = 60 * 5
+INGREDIENT_SEARCH_LIMIT = 20
+CATALOG_CACHE_TTL = 60 * 5
+CATALOG_CACHE_MAX_ENTRIES = 1000
+RECIPE_IMAGE_VARIANTS = {'small': (320, 320), 'medium': (800, 800)}
+RECIPE_IMAGE_FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+RECIPE_IMAGE_QUALITY = 80
+IMAGE_QUEUE_SIZE = 32
+SCORE_CART_WEIGHT = 0.5
+TRENDING_HALF_LIFE = 60 * 60 * 24 * 3
+TRENDING_WINDOW = 60 * 60 * 24 * 14
+SCORE_BATCH_SIZE = 1000
+FEED_CACHE_TTL = 60
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+DURATION_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+RESPONSE_SIZE_BUCKETS = tuple(1024 * 2 ** power for power in range(0, 12, 2))
+DUPLICATE_QUERY_THRESHOLD = 3
+SEARCH_CONFIG = 'russian'
+SEARCH_BATCH_SIZE = 1000
+RECIPE_SEARCH_INDEX_TTL = 60 * 5
+PANTRY_MAX_INGREDIENTS = 200
+BULK_MAX_RECIPES = 100
+PENDING_IMAGE_PATH = 'recipies/pending/'
+PENDING_IMAGE_TIMEOUT = 60 * 10
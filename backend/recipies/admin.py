@@ -42,16 +42,13 @@ class RecipeAdmin(admin.ModelAdmin):
     """Модель Recipe в админке."""
 
     list_display = ('name', 'author', 'text', 'cooking_time',
-                    'pub_date', 'count_favorites')
+                    'pub_date', 'favorites_count', 'in_carts_count')
     search_fields = ('name', 'author', 'tags', 'ingridients')
     list_filter = ('author', 'name', 'tags')
+    readonly_fields = ('favorites_count', 'in_carts_count')
     inlines = (IngredientInRecipeInline, RecipeTagInLine)
     empty_value_display = EMPTY_VALUE
 
-    @admin.display(description='Избранное')
-    def count_favorites(self, obj):
-        return obj.favorites.count()
-
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
@@ -0,0 +1,44 @@
+from django.apps import apps as global_apps
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = {
+    'favorites_count': 'Favorite',
+    'in_carts_count': 'ShoppingCart',
+}
+
+
+def change_counter(recipes, field, delta):
+    """Атомарно изменяет счетчик у рецептов из queryset."""
+    return recipes.update(**{field: F(field) + delta})
+
+
+def actual_counts(apps=global_apps):
+    """Подзапросы с фактическим числом строк избранного и корзины."""
+    return {
+        field: Coalesce(Subquery(
+            apps.get_model('recipies', model_name).objects
+            .filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()), 0)
+        for field, model_name in COUNTERS.items()
+    }
+
+
+def recount(apps=global_apps):
+    """Пересчитывает счетчики одним UPDATE.
+
+    Возвращает число рецептов, у которых счетчики разошлись с данными.
+    """
+    recipes = apps.get_model('recipies', 'Recipe').objects
+    drifted = recipes.annotate(
+        **{f'actual_{field}': value
+           for field, value in actual_counts(apps).items()}
+    ).exclude(**{field: F(f'actual_{field}') for field in COUNTERS})
+    changed = drifted.count()
+    if changed:
+        recipes.update(**actual_counts(apps))
+    return changed
@@ -0,0 +1,61 @@
+import re
+from collections import defaultdict
+
+from constants import SEARCH_BATCH_SIZE
+from django.apps import apps as global_apps
+
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, ё заменяется на е."""
+    return WORD.findall(text.lower().replace('ё', 'е'))
+
+
+def build_search_document(name, text, ingredient_names):
+    """Текст для поиска: название, описание и названия ингредиентов."""
+    return '\n'.join((name, text, ' '.join(ingredient_names)))
+
+
+def update_search_documents(recipe_ids, apps=global_apps):
+    """Пересобирает поисковые документы рецептов с recipe_ids.
+
+    Сохраняет одним bulk_update только изменившиеся документы
+    и возвращает их в виде {id рецепта: документ}.
+    """
+    recipe_model = apps.get_model('recipies', 'Recipe')
+    ingredient_names = defaultdict(list)
+    for recipe_id, name in (
+        apps.get_model('recipies', 'IngridientInRecipe').objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by('pk')
+        .values_list('recipe_id', 'ingredient__name')
+    ):
+        ingredient_names[recipe_id].append(name)
+    changed = []
+    for recipe in recipe_model.objects.filter(pk__in=recipe_ids).only(
+            'name', 'text', 'search_document'):
+        document = build_search_document(
+            recipe.name, recipe.text, ingredient_names[recipe.pk])
+        if document != recipe.search_document:
+            recipe.search_document = document
+            changed.append(recipe)
+    recipe_model.objects.bulk_update(changed, ['search_document'])
+    return {recipe.pk: recipe.search_document for recipe in changed}
+
+
+def rebuild_search_documents(apps=global_apps, batch_size=SEARCH_BATCH_SIZE):
+    """Пересобирает документы всех рецептов пачками по batch_size.
+
+    Возвращает число обновленных документов.
+    """
+    recipe_ids = (apps.get_model('recipies', 'Recipe').objects
+                  .order_by('pk').values_list('pk', flat=True))
+    changed = 0
+    last_id = 0
+    while True:
+        batch = list(recipe_ids.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return changed
+        changed += len(update_search_documents(batch, apps))
+        last_id = batch[-1]
@@ -0,0 +1,100 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from constants import (RECIPE_IMAGE_FORMATS, RECIPE_IMAGE_QUALITY,
+                       RECIPE_IMAGE_VARIANTS)
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a',
+                    b'GIF89a')
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def is_image_header(data):
+    """Проверяет сигнатуру формата по первым байтам файла."""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return True
+    return data.startswith(IMAGE_SIGNATURES)
+
+
+def get_image_extension(storage, name):
+    """Расширение файла по формату, который определил Pillow.
+
+    Файл полностью проверяется, неподдерживаемые форматы отклоняются.
+    """
+    with storage.open(name, 'rb') as file:
+        try:
+            image = Image.open(file)
+            image_format = image.format
+            image.verify()
+        except (SyntaxError, ValueError) as error:
+            raise OSError(error) from error
+    if image_format not in IMAGE_EXTENSIONS:
+        raise OSError(f'Неподдерживаемый формат изображения {image_format}')
+    return IMAGE_EXTENSIONS[image_format]
+
+
+def get_variant_name(name, variant, extension):
+    """Имя уменьшенной копии в отдельной папке исходного файла.
+
+    В папку variants/ пишет только этот модуль, поэтому копии не могут
+    совпасть по имени с исходными изображениями других рецептов.
+    """
+    path = PurePosixPath(name)
+    return str(path.parent / 'variants' / path.name
+               / f'{variant}.{extension}')
+
+
+def get_variant_names(name):
+    return {
+        variant: {
+            extension: get_variant_name(name, variant, extension)
+            for extension in RECIPE_IMAGE_FORMATS
+        }
+        for variant in RECIPE_IMAGE_VARIANTS
+    }
+
+
+def has_image_variants(image):
+    variant = next(iter(RECIPE_IMAGE_VARIANTS))
+    extension = next(iter(RECIPE_IMAGE_FORMATS))
+    return image.storage.exists(
+        get_variant_name(image.name, variant, extension))
+
+
+def delete_image_files(image):
+    """Удаляет файл изображения вместе с его копиями."""
+    for names in get_variant_names(image.name).values():
+        for name in names.values():
+            image.storage.delete(name)
+    image.storage.delete(image.name)
+
+
+def encode_image(image, image_format):
+    if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image_format != 'JPEG' and 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=RECIPE_IMAGE_QUALITY,
+               optimize=True)
+    return buffer.getvalue()
+
+
+def create_image_variants(image):
+    """Сохраняет уменьшенные и пережатые копии изображения рецепта."""
+    storage = image.storage
+    with storage.open(image.name, 'rb') as file:
+        source = ImageOps.exif_transpose(Image.open(file))
+        source.load()
+    for variant, size in RECIPE_IMAGE_VARIANTS.items():
+        resized = source.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension, image_format in RECIPE_IMAGE_FORMATS.items():
+            name = get_variant_name(image.name, variant, extension)
+            storage.delete(name)
+            saved = storage.save(name, ContentFile(encode_image(
+                resized, image_format)))
+            if saved != name:
+                # Копию того же файла успела записать параллельная задача.
+                storage.delete(saved)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from recipies.images import create_image_variants, has_image_variants
+from recipies.models import Recipe
+from recipies.tasks import set_image_fields
+
+
+class Command(BaseCommand):
+    help = "Создание уменьшенных копий для загруженных изображений рецептов"
+
+    def handle(self, *args, **options):
+        recipes = (
+            Recipe.objects
+            .filter(image_variants_ready=False,
+                    image_status=Recipe.ImageStatus.READY)
+            .exclude(image='')
+            .exclude(image__isnull=True)
+            .only('image')
+        )
+        created = failed = 0
+        for recipe in recipes.iterator():
+            try:
+                if not has_image_variants(recipe.image):
+                    create_image_variants(recipe.image)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe.pk}: {error}')
+                continue
+            set_image_fields(Recipe.objects.filter(pk=recipe.pk), recipe.pk,
+                             image_variants_ready=True)
+            created += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {created}, ошибок: {failed}'))
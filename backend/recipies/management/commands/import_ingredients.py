@@ -1,19 +1,104 @@
 import csv
+import json
+import time
+from pathlib import Path
 
-from constants import CSV_PATH
-from django.core.management.base import BaseCommand
+from constants import CSV_PATH, IMPORT_BATCH_SIZE
+from django.core.management.base import BaseCommand, CommandError
 from recipies.models import Ingredient
 
+CSV_HEADER = ['name', 'measurement_unit']
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row == CSV_HEADER:
+            continue
+        yield row
+
+
+def read_json(file):
+    """Построчно разбирает JSON-массив, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON оборван')
+            buffer += chunk
+            continue
+        yield item.get('name'), item.get('measurement_unit')
+        buffer = buffer[end:]
+
+
+READERS = {'csv': read_csv, 'json': read_json}
+
 
 class Command(BaseCommand):
-    help = "Заполнение БД ингредиентами"
-
-    def handle(self, *args, **kwargs):
-        with open(CSV_PATH, encoding='utf-8') as file:
-            csvreader = csv.reader(file)
-            next(csvreader)
-            for row in csvreader:
-                Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measurement_unit=row[1],
-                )
+    help = "Заполнение БД ингредиентами из CSV или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=CSV_PATH,
+                            help='Путь к файлу с ингредиентами')
+        parser.add_argument('--format', choices=READERS,
+                            help='Формат файла, по умолчанию по расширению')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE,
+                            help='Количество строк в одной пачке')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть больше нуля')
+
+        self.verbosity = options['verbosity']
+        self.inserted = self.skipped = 0
+        start = time.perf_counter()
+        batch = {}
+        with open(path, encoding='utf-8') as file:
+            for row in READERS[file_format](file):
+                if len(row) != 2 or not all(row):
+                    self.skipped += 1
+                    continue
+                key = (row[0].strip(), row[1].strip())
+                if key in batch:
+                    self.skipped += 1
+                    continue
+                batch[key] = None
+                if len(batch) >= batch_size:
+                    self.write_batch(batch)
+                    batch = {}
+        if batch:
+            self.write_batch(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {self.inserted}, пропущено: {self.skipped}, '
+            f'время: {time.perf_counter() - start:.2f} с'))
+
+    def write_batch(self, batch):
+        """Добавляет пачку, пропуская ингредиенты, которые уже есть в БД."""
+        existing = set(
+            Ingredient.objects
+            .filter(name__in={name for name, _ in batch})
+            .values_list('name', 'measurement_unit')
+        )
+        new = [Ingredient(name=name, measurement_unit=unit)
+               for name, unit in batch if (name, unit) not in existing]
+        Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+        self.inserted += len(new)
+        self.skipped += len(batch) - len(new)
+        if self.verbosity > 1:
+            self.stdout.write(f'Обработано: {self.inserted + self.skipped}')
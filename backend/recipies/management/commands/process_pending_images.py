@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from constants import PENDING_IMAGE_TIMEOUT
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipies.models import Recipe
+from recipies.tasks import process_pending_image, run_task
+
+
+class Command(BaseCommand):
+    help = "Повторная обработка изображений, зависших в статусе pending"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--age', type=int,
+                            default=PENDING_IMAGE_TIMEOUT,
+                            help='Сколько секунд рецепт должен ждать '
+                                 'обработки')
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects
+            .filter(image_status=Recipe.ImageStatus.PENDING,
+                    updated__lt=timezone.now() - timedelta(
+                        seconds=options['age']))
+            .values_list('pk', flat=True)
+        )
+        for recipe_id in recipe_ids:
+            run_task(process_pending_image, recipe_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {len(recipe_ids)}'))
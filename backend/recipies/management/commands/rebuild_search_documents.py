@@ -0,0 +1,19 @@
+from constants import SEARCH_BATCH_SIZE
+from django.core.management.base import BaseCommand, CommandError
+from recipies.documents import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = "Пересборка поисковых документов рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=SEARCH_BATCH_SIZE,
+                            help='Количество рецептов в одной пачке')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля')
+        changed = rebuild_search_documents(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено документов: {changed}'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipies.counters import recount
+
+
+class Command(BaseCommand):
+    help = "Пересчет счетчиков избранного и корзины у рецептов"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            changed = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено рецептов: {changed}'))
@@ -0,0 +1,26 @@
+import time
+
+from constants import SCORE_BATCH_SIZE
+from django.core.management.base import BaseCommand, CommandError
+from recipies.scores import refresh_scores
+
+
+class Command(BaseCommand):
+    help = "Пересчет рейтингов популярности и трендов рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать все рецепты, а не только '
+                                 'измененные')
+        parser.add_argument('--batch-size', type=int,
+                            default=SCORE_BATCH_SIZE,
+                            help='Количество рецептов в одной пачке')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля')
+        start = time.perf_counter()
+        refreshed = refresh_scores(options['full'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рейтингов: {refreshed}, '
+            f'время: {time.perf_counter() - start:.2f} с'))
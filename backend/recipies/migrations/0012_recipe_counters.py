@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    from recipies.counters import recount
+    recount(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipies', '0011_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
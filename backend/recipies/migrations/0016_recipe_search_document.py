@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+SEARCH_INDEX = 'recipe_search_document_gin'
+
+
+def fill_search_documents(apps, schema_editor):
+    from recipies.documents import rebuild_search_documents
+    rebuild_search_documents(apps)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from constants import SEARCH_CONFIG
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON recipies_recipe '
+        f"USING gin (to_tsvector('{SEARCH_CONFIG}', search_document))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipies', '0015_recipetag_tag_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст для поиска'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipies', '0016_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_ready',
+            field=models.BooleanField(default=False, verbose_name='Копии изображения готовы'),
+        ),
+    ]
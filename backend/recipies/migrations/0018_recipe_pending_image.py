@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipies', '0017_recipe_image_variants_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='pending_image',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Файл изображения в обработке'),
+        ),
+    ]
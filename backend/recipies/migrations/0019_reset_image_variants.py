@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 23:50
+
+from django.db import migrations
+
+
+def reset_image_variants(apps, schema_editor):
+    """Копии переехали в папку variants/, их нужно создать заново."""
+    apps.get_model('recipies', 'Recipe').objects.update(
+        image_variants_ready=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipies', '0018_recipe_pending_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_image_variants, migrations.RunPython.noop),
+    ]
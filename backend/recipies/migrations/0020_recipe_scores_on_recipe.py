@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+def copy_scores(apps, schema_editor):
+    """Переносит рейтинги из RecipeScore в поля рецепта."""
+    scores = apps.get_model('recipies', 'RecipeScore').objects.filter(
+        recipe_id=models.OuterRef('pk'))
+    apps.get_model('recipies', 'Recipe').objects.filter(
+        models.Exists(scores)
+    ).update(
+        popularity=models.Subquery(scores.values('popularity')[:1]),
+        trending=models.Subquery(scores.values('trending')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipies', '0019_reset_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность за последние дни'),
+        ),
+        migrations.RunPython(copy_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popularity', '-pub_date', '-id'], name='recipe_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending', '-pub_date', '-id'], name='recipe_trending_idx'),
+        ),
+        migrations.DeleteModel(
+            name='RecipeScore',
+        ),
+    ]
@@ -53,6 +53,11 @@ class Tag(models.Model):
 class Recipe(models.Model):
     """Модель рецепта"""
 
+    class ImageStatus(models.TextChoices):
+        PENDING = 'pending', 'Обрабатывается'
+        READY = 'ready', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
     tags = models.ManyToManyField(Tag,
                                   through='RecipeTag',
                                   verbose_name='Теги')
@@ -65,6 +70,16 @@ class Recipe(models.Model):
     image = models.ImageField('Изображение рецепта',
                               upload_to='recipies/images/',
                               null=True)
+    image_status = models.CharField('Статус изображения',
+                                    max_length=10,
+                                    choices=ImageStatus.choices,
+                                    default=ImageStatus.READY)
+    image_variants_ready = models.BooleanField('Копии изображения готовы',
+                                               default=False)
+    pending_image = models.CharField('Файл изображения в обработке',
+                                     max_length=255,
+                                     blank=True,
+                                     editable=False)
     name = models.CharField('Название рецепта',
                             max_length=200)
     text = models.TextField('Описание рецепта')
@@ -73,12 +88,37 @@ class Recipe(models.Model):
                                        validators=[validate_cooking_time])
     pub_date = models.DateTimeField('Дата публикации',
                                     auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения',
+                                   auto_now=True)
+    favorites_count = models.PositiveIntegerField('Добавлений в избранное',
+                                                  default=0)
+    in_carts_count = models.PositiveIntegerField('Добавлений в корзину',
+                                                 default=0)
+    search_document = models.TextField('Текст для поиска',
+                                       blank=True,
+                                       editable=False)
+    popularity = models.FloatField('Популярность',
+                                   default=0,
+                                   editable=False)
+    trending = models.FloatField('Популярность за последние дни',
+                                 default=0,
+                                 editable=False)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
         default_related_name = 'recipes'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-popularity', '-pub_date', '-id'],
+                         name='recipe_popularity_idx'),
+            models.Index(fields=['-trending', '-pub_date', '-id'],
+                         name='recipe_trending_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -123,6 +163,10 @@ class RecipeTag(models.Model):
                 name='recipe_tag'
             )
         ]
+        indexes = [
+            models.Index(fields=['tag', 'recipe'],
+                         name='recipe_tag_tag_recipe_idx')
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -134,6 +178,8 @@ class ShoppingCart(models.Model):
     recipe = models.ForeignKey(Recipe,
                                on_delete=models.CASCADE,
                                verbose_name='Рецепт')
+    created = models.DateTimeField('Дата добавления',
+                                   auto_now_add=True)
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -159,6 +205,8 @@ class Favorite(models.Model):
     recipe = models.ForeignKey(Recipe,
                                on_delete=models.CASCADE,
                                verbose_name='Рецепт')
+    created = models.DateTimeField('Дата добавления',
+                                   auto_now_add=True)
 
     class Meta:
         verbose_name = 'Избранное'
@@ -0,0 +1,29 @@
+from django.db.models import (Count, Exists, ExpressionWrapper, F,
+                              FloatField, OuterRef, Q)
+from django.db.models.functions import Cast
+
+from .models import IngridientInRecipe
+
+
+def rank_by_pantry(recipes, ingredient_ids):
+    """Рецепты хотя бы с одним ингредиентом из ingredient_ids.
+
+    Доля имеющихся ингредиентов и число недостающих считаются одним
+    GROUP BY по IngridientInRecipe. Сначала идут рецепты с большей долей,
+    при равной доле — с меньшим числом недостающих.
+    """
+    in_pantry = Q(ingredients_in_recipe__ingredient_id__in=ingredient_ids)
+    return (
+        recipes
+        .filter(Exists(IngridientInRecipe.objects.filter(
+            recipe=OuterRef('pk'), ingredient_id__in=ingredient_ids)))
+        .annotate(ingredients_total=Count('ingredients_in_recipe'),
+                  matched_count=Count('ingredients_in_recipe',
+                                      filter=in_pantry))
+        .annotate(
+            missing_count=F('ingredients_total') - F('matched_count'),
+            coverage=ExpressionWrapper(
+                Cast('matched_count', FloatField()) / F('ingredients_total'),
+                output_field=FloatField()))
+        .order_by('-coverage', 'missing_count', '-pub_date', '-id')
+    )
@@ -0,0 +1,67 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from constants import (SCORE_BATCH_SIZE, SCORE_CART_WEIGHT,
+                       TRENDING_HALF_LIFE, TRENDING_WINDOW)
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart
+
+ACTIVITY_WEIGHTS = ((Favorite, 1.0), (ShoppingCart, SCORE_CART_WEIGHT))
+
+
+def popularity_expression():
+    return F('favorites_count') + SCORE_CART_WEIGHT * F('in_carts_count')
+
+
+def stale_recipe_ids(since):
+    """Рецепты, рейтинг которых мог измениться.
+
+    Это рецепты с активностью за окно трендов, рецепты с ненулевым
+    трендом, который надо состарить, и рецепты, у которых популярность
+    разошлась со счетчиками.
+    """
+    ids = set()
+    for model, _ in ACTIVITY_WEIGHTS:
+        ids.update(model.objects.filter(created__gte=since)
+                   .values_list('recipe_id', flat=True).distinct())
+    ids.update(Recipe.objects.filter(trending__gt=0)
+               .values_list('pk', flat=True))
+    ids.update(Recipe.objects.exclude(popularity=popularity_expression())
+               .values_list('pk', flat=True))
+    return ids
+
+
+def get_trending(recipe_ids, since, now):
+    """Сумма активности с экспоненциальным затуханием по времени."""
+    trending = defaultdict(float)
+    for model, weight in ACTIVITY_WEIGHTS:
+        activity = model.objects.filter(
+            recipe_id__in=recipe_ids, created__gte=since
+        ).values_list('recipe_id', 'created')
+        for recipe_id, created in activity.iterator():
+            age = (now - created).total_seconds()
+            trending[recipe_id] += weight * 0.5 ** (age / TRENDING_HALF_LIFE)
+    return trending
+
+
+def refresh_scores(full=False, batch_size=SCORE_BATCH_SIZE):
+    """Пересчитывает рейтинги рецептов, возвращает число обновленных."""
+    now = timezone.now()
+    since = now - timedelta(seconds=TRENDING_WINDOW)
+    if full:
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+    else:
+        recipe_ids = sorted(stale_recipe_ids(since))
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        trending = get_trending(batch, since, now)
+        recipes = list(Recipe.objects.filter(pk__in=batch)
+                       .annotate(current=popularity_expression())
+                       .only('pk'))
+        for recipe in recipes:
+            recipe.popularity = recipe.current
+            recipe.trending = trending.get(recipe.pk, 0)
+        Recipe.objects.bulk_update(recipes, ['popularity', 'trending'])
+    return len(recipe_ids)
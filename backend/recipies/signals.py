@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Фоновая обработка изображения рецепта закончилась (аргумент recipe_id).
+recipe_image_processed = Signal()
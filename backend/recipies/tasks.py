@@ -0,0 +1,166 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from uuid import uuid4
+
+from constants import IMAGE_QUEUE_SIZE, PENDING_IMAGE_PATH
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.db import connections
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.exceptions import ValidationError
+
+from .images import (create_image_variants, delete_image_files,
+                     get_image_extension)
+from .models import Recipe
+from .signals import recipe_image_processed
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS,
+                              thread_name_prefix='recipe-images')
+queue_slots = BoundedSemaphore(IMAGE_QUEUE_SIZE)
+
+
+def run_task(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', task.__name__)
+
+
+def run_in_worker(task, *args):
+    try:
+        run_task(task, *args)
+    finally:
+        queue_slots.release()
+        connections.close_all()
+
+
+def submit(task, *args):
+    """Ставит задачу в очередь пула обработки изображений.
+
+    В режиме IMAGE_TASKS_EAGER и при переполненной очереди задача
+    выполняется сразу в текущем потоке.
+    """
+    if settings.IMAGE_TASKS_EAGER or not queue_slots.acquire(blocking=False):
+        run_task(task, *args)
+        return
+    executor.submit(run_in_worker, task, *args)
+
+
+def set_image_fields(recipes, recipe_id, **fields):
+    """Сохраняет поля изображения без сигналов модели и сообщает об этом.
+
+    Возвращает число обновленных рецептов.
+    """
+    updated = recipes.update(**fields)
+    if updated:
+        recipe_image_processed.send(sender=Recipe, recipe_id=recipe_id)
+    return updated
+
+
+def store_pending_image(image):
+    """Сохраняет изображение в хранилище до коммита и возвращает имя файла.
+
+    Файл получает имя на сервере и лежит в PENDING_IMAGE_PATH, пока
+    фоновая задача его не проверит: строка base64 записывается как есть,
+    загруженный файл — без имени и расширения клиента.
+    """
+    storage = Recipe.image.field.storage
+    if isinstance(image, UploadedFile):
+        return storage.save(f'{PENDING_IMAGE_PATH}{uuid4().hex}.upload',
+                            image)
+    return storage.save(f'{PENDING_IMAGE_PATH}{uuid4().hex}.b64',
+                        ContentFile(image.encode()))
+
+
+def process_pending_image(recipe_id):
+    """Обрабатывает сохраненное изображение рецепта в статусе pending."""
+    recipes = Recipe.objects.filter(pk=recipe_id,
+                                    image_status=Recipe.ImageStatus.PENDING)
+    recipe = recipes.first()
+    if recipe is None:
+        return
+    name = recipe.pending_image
+    # Пока файл обрабатывался, рецепт могли обновить с новым изображением.
+    recipes = recipes.filter(pending_image=name)
+    if not name:
+        set_image_fields(recipes, recipe_id,
+                         image_status=Recipe.ImageStatus.FAILED)
+    elif name.endswith('.b64'):
+        process_recipe_image(recipes, recipe, name)
+    else:
+        process_uploaded_image(recipes, recipe, name)
+
+
+def process_recipe_image(recipes, recipe, name):
+    """Декодирует сохраненную строку base64 и сохраняет изображение."""
+    storage = Recipe.image.field.storage
+    try:
+        with storage.open(name, 'rb') as file:
+            content = Base64ImageField().to_internal_value(
+                file.read().decode('latin-1'))
+        recipe.image.save(content.name, content, save=False)
+        create_image_variants(recipe.image)
+    except (ValidationError, DjangoValidationError):
+        set_image_fields(recipes, recipe.pk, pending_image='',
+                         image_status=Recipe.ImageStatus.FAILED)
+        return
+    except Exception:
+        set_image_fields(recipes, recipe.pk, pending_image='',
+                         image_status=Recipe.ImageStatus.FAILED)
+        raise
+    finally:
+        storage.delete(name)
+    set_processed_image(recipes, recipe)
+
+
+def process_uploaded_image(recipes, recipe, name):
+    """Проверяет загруженный файл и переносит его к изображениям рецептов.
+
+    Имя файла создается на сервере, расширение берется из формата,
+    определенного Pillow.
+    """
+    field = Recipe.image.field
+    storage = field.storage
+    try:
+        extension = get_image_extension(storage, name)
+        with storage.open(name, 'rb') as file:
+            recipe.image.name = storage.save(field.generate_filename(
+                recipe, f'{uuid4().hex}.{extension}'), file)
+        create_image_variants(recipe.image)
+    except OSError:
+        set_image_fields(recipes, recipe.pk, pending_image='',
+                         image_status=Recipe.ImageStatus.FAILED)
+        return
+    except Exception:
+        set_image_fields(recipes, recipe.pk, pending_image='',
+                         image_status=Recipe.ImageStatus.FAILED)
+        raise
+    finally:
+        storage.delete(name)
+    set_processed_image(recipes, recipe)
+
+
+def set_processed_image(recipes, recipe):
+    """Подставляет готовое изображение, если оно все еще ожидается.
+
+    Иначе файл и его копии уже никому не нужны и удаляются.
+    """
+    if not set_image_fields(recipes, recipe.pk, image=recipe.image.name,
+                            pending_image='',
+                            image_status=Recipe.ImageStatus.READY,
+                            image_variants_ready=True):
+        delete_image_files(recipe.image)
+
+
+def process_image_variants(recipe_id):
+    recipes = Recipe.objects.filter(pk=recipe_id)
+    recipe = recipes.first()
+    if recipe is not None and recipe.image:
+        create_image_variants(recipe.image)
+        set_image_fields(recipes.filter(image=recipe.image.name), recipe_id,
+                         image_variants_ready=True)
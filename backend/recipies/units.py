@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+from django.db.models.functions import Lower, Trim
+
+UNIT_SPELLINGS = {
+    'г': ('г', 'гр', 'гр.', 'грамм'),
+    'кг': ('кг', 'кг.', 'килограмм'),
+    'мл': ('мл', 'мл.', 'миллилитр'),
+    'л': ('л', 'л.', 'литр'),
+    'шт.': ('шт.', 'шт', 'штука'),
+    'ст. л.': ('ст. л.', 'ст.л.', 'столовая ложка'),
+    'ч. л.': ('ч. л.', 'ч.л.', 'чайная ложка'),
+}
+
+CONVERSIONS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+
+CANONICAL_UNITS = {spelling: unit
+                   for unit, spellings in UNIT_SPELLINGS.items()
+                   for spelling in spellings}
+
+
+def normalize_unit(unit):
+    """Единица измерения в написании из UNIT_SPELLINGS."""
+    unit = ' '.join(unit.split())
+    return CANONICAL_UNITS.get(unit.lower(), unit)
+
+
+def to_base(unit):
+    """Базовая единица и целый множитель для перевода в нее."""
+    unit = normalize_unit(unit)
+    return CONVERSIONS.get(unit, (unit, 1))
+
+
+def spelling_expression(field):
+    """Единица измерения без пробелов по краям и в нижнем регистре."""
+    return Lower(Trim(field))
+
+
+def spelling_variants(unit):
+    """Написания единицы и их варианты в верхнем регистре.
+
+    Нужны для баз данных, где LOWER не меняет регистр кириллицы.
+    """
+    return sorted({variant for spelling in UNIT_SPELLINGS[unit]
+                   for variant in (spelling, spelling.capitalize(),
+                                   spelling.upper())})
+
+
+def base_unit_expression(field):
+    """Базовая единица в запросе; field — аннотация spelling_expression."""
+    return Case(
+        *(When(**{f'{field}__in': spelling_variants(unit)},
+               then=Value(to_base(unit)[0]))
+          for unit in UNIT_SPELLINGS),
+        default=F(field),
+        output_field=CharField()
+    )
+
+
+def base_amount_expression(amount_field, unit_field):
+    """Количество в базовой единице, целое, для суммирования в запросе.
+
+    unit_field — аннотация spelling_expression.
+    """
+    return F(amount_field) * Case(
+        *(When(**{f'{unit_field}__in': spelling_variants(unit)},
+               then=Value(factor))
+          for unit, (_, factor) in CONVERSIONS.items()),
+        default=Value(1),
+        output_field=IntegerField()
+    )
+
+
+def to_display(amount, base_unit):
+    """Количество в самой крупной единице, где оно не меньше единицы.
+
+    Целые количества остаются целыми, дробные возвращаются точным Decimal.
+    """
+    units = sorted(((factor, unit)
+                    for unit, (base, factor) in CONVERSIONS.items()
+                    if base == base_unit), reverse=True)
+    for factor, unit in units:
+        if amount >= factor:
+            if amount % factor:
+                return Decimal(amount) / factor, unit
+            return amount // factor, unit
+    return amount, base_unit
@@ -0,0 +1,156 @@
+import csv
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from api.cache import CATALOG_CACHES
+from api.search import recipe_index
+from constants import BASE_DIR
+from django.conf import settings
+from django.core.cache import caches
+from recipies.counters import recount
+from recipies.documents import rebuild_search_documents
+from recipies.models import (Favorite, Ingredient, IngridientInRecipe, Recipe,
+                             RecipeTag, ShoppingCart, Tag)
+from rest_framework.test import APIClient
+from users.models import CustomUser, Subscription
+
+USERS_COUNT = 2000
+AUTHORS_COUNT = 500
+TAGS_COUNT = 1000
+RECIPES_COUNT = 3000
+INGREDIENTS_PER_RECIPE = 6
+TAGS_PER_RECIPE = 2
+FAVORITES_COUNT = 30
+CART_COUNT = 20
+SUBSCRIPTIONS_COUNT = 40
+
+MAX_SECONDS = 1.0
+
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieyw'
+         'aAAAACVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQV'
+         'QImWNoAAAAggCByxOyYQAAAABJRU5ErkJggg==')
+
+
+def seed_dataset():
+    """Синтетический набор данных: тысячи пользователей и рецептов."""
+    CustomUser.objects.bulk_create(
+        CustomUser(email=f'user{i}@foodgram.ru', username=f'user{i}',
+                   first_name='Имя', last_name='Фамилия', password='!')
+        for i in range(USERS_COUNT)
+    )
+    users = list(CustomUser.objects.order_by('id'))
+    authors = users[1:AUTHORS_COUNT + 1]
+
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {i}', color=f'#{i:06x}', slug=f'tag{i}')
+        for i in range(TAGS_COUNT)
+    )
+    tags = list(Tag.objects.order_by('id'))
+
+    with open(BASE_DIR / 'data' / 'ingredients.csv', encoding='utf-8') as file:
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit=unit)
+            for name, unit in csv.reader(file)
+        )
+    ingredients = list(Ingredient.objects.order_by('id'))
+
+    Recipe.objects.bulk_create(
+        Recipe(author=authors[i % AUTHORS_COUNT], name=f'Рецепт {i}',
+               text='Описание рецепта', cooking_time=i % 120 + 1,
+               image='recipies/images/test.png')
+        for i in range(RECIPES_COUNT)
+    )
+    recipes = list(Recipe.objects.order_by('id'))
+    IngridientInRecipe.objects.bulk_create(
+        IngridientInRecipe(
+            recipe=recipe,
+            ingredient=ingredients[(i * 7 + j) % len(ingredients)],
+            amount=j + 1)
+        for i, recipe in enumerate(recipes)
+        for j in range(INGREDIENTS_PER_RECIPE)
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tags[(i + j) % TAGS_COUNT])
+        for i, recipe in enumerate(recipes)
+        for j in range(TAGS_PER_RECIPE)
+    )
+
+    user = users[0]
+    Favorite.objects.bulk_create(
+        Favorite(user=user, recipe=recipe)
+        for recipe in recipes[:FAVORITES_COUNT]
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipe)
+        for recipe in recipes[:CART_COUNT]
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for author in authors[:SUBSCRIPTIONS_COUNT]
+    )
+    recount()
+    rebuild_search_documents()
+    return SimpleNamespace(
+        user_id=user.id,
+        other_user_id=users[-1].id,
+        author_id=authors[0].id,
+        recipe_id=recipes[-1].id,
+        tag_ids=[tag.id for tag in tags[:TAGS_PER_RECIPE]],
+        ingredient_ids=[ingredient.id for ingredient in ingredients[:30]],
+    )
+
+
+@pytest.fixture(scope='session')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        return seed_dataset()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    for catalog in CATALOG_CACHES:
+        catalog.bump()
+    recipe_index.invalidate()
+
+
+@pytest.fixture
+def user(db, dataset):
+    return CustomUser.objects.get(id=dataset.user_id)
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def anon_client(db, dataset):
+    return APIClient()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def budget(django_assert_max_num_queries):
+    """Проверяет верхнюю границу числа SQL-запросов и времени ответа."""
+
+    @contextmanager
+    def check(max_queries, max_seconds=MAX_SECONDS):
+        start = time.perf_counter()
+        with django_assert_max_num_queries(max_queries):
+            yield
+        elapsed = time.perf_counter() - start
+        assert elapsed < max_seconds, (
+            f'Запрос занял {elapsed:.3f} с, бюджет {max_seconds} с')
+
+    return check
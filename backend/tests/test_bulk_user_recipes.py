@@ -0,0 +1,90 @@
+"""Массовое добавление и удаление рецептов из избранного и корзины."""
+import pytest
+from recipies.models import Favorite, Recipe, ShoppingCart
+from rest_framework import status
+
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+ENDPOINTS = [('favorite/', Favorite, 'favorites_count'),
+             ('shopping_cart/', ShoppingCart, 'in_carts_count')]
+
+
+def user_recipe_ids(model, user):
+    return set(model.objects.filter(user=user)
+               .values_list('recipe_id', flat=True))
+
+
+@pytest.mark.parametrize('endpoint,model,counter', ENDPOINTS)
+def test_bulk_add_and_remove(user_client, user, endpoint, model, counter):
+    present = sorted(user_recipe_ids(model, user))[0]
+    new_ids = list(Recipe.objects.exclude(
+        pk__in=user_recipe_ids(model, user)).values_list('pk', flat=True)[:3])
+    missing = Recipe.objects.order_by('-pk').first().pk + 1
+    payload = {'recipes': [*new_ids, present, missing, new_ids[0]]}
+    counts = dict(Recipe.objects.filter(pk__in=new_ids)
+                  .values_list('pk', counter))
+
+    response = user_client.post(RECIPES_URL + endpoint, payload,
+                                format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results'] == [
+        *({'id': pk, 'status': 'added'} for pk in new_ids),
+        {'id': present, 'status': 'exists'},
+        {'id': missing, 'status': 'not_found'},
+    ]
+    assert set(new_ids) <= user_recipe_ids(model, user)
+    for pk, count in Recipe.objects.filter(pk__in=new_ids).values_list(
+            'pk', counter):
+        assert count == counts[pk] + 1
+    detail = user_client.get(f'{RECIPES_URL}{new_ids[0]}/').data
+    assert detail[counter] == counts[new_ids[0]] + 1
+
+    response = user_client.delete(
+        RECIPES_URL + endpoint, {'recipes': [new_ids[0], missing]},
+        format='json')
+    assert response.data['results'] == [
+        {'id': new_ids[0], 'status': 'removed'},
+        {'id': missing, 'status': 'not_found'},
+    ]
+    response = user_client.delete(
+        RECIPES_URL + endpoint, {'recipes': [new_ids[0]]}, format='json')
+    assert response.data['results'] == [
+        {'id': new_ids[0], 'status': 'absent'}]
+    assert getattr(Recipe.objects.get(pk=new_ids[0]), counter) == (
+        counts[new_ids[0]])
+
+
+@pytest.mark.parametrize('endpoint,model,counter', ENDPOINTS)
+@pytest.mark.parametrize('size', [1, 100])
+def test_bulk_budget(user_client, user, budget, endpoint, model, counter,
+                     size):
+    recipe_ids = list(Recipe.objects.exclude(
+        pk__in=user_recipe_ids(model, user)).values_list(
+        'pk', flat=True)[:size])
+    with budget(6):
+        response = user_client.post(RECIPES_URL + endpoint,
+                                    {'recipes': recipe_ids}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    with budget(7):
+        response = user_client.delete(RECIPES_URL + endpoint,
+                                      {'recipes': recipe_ids}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert {item['status'] for item in response.data['results']} == {
+        'removed'}
+
+
+@pytest.mark.parametrize('payload', [{}, {'recipes': []},
+                                     {'recipes': ['abc']},
+                                     {'recipes': list(range(1, 102))}])
+def test_bulk_invalid(user_client, payload):
+    response = user_client.post(RECIPES_URL + 'favorite/', payload,
+                                format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_bulk_anonymous(anon_client):
+    response = anon_client.post(RECIPES_URL + 'shopping_cart/',
+                                {'recipes': [1]}, format='json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,105 @@
+"""Загрузка изображений рецептов в multipart-запросах."""
+import json
+import tracemalloc
+from io import BytesIO
+from pathlib import PurePosixPath
+
+import pytest
+from constants import PENDING_IMAGE_PATH
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from recipies.models import Recipe
+from rest_framework import status
+
+from .test_query_budget import RECIPES_URL, recipe_payload
+
+pytestmark = pytest.mark.django_db
+
+UPLOAD_SIZE = 8 * 1024 * 1024
+
+
+def make_jpeg(size=(1200, 800)):
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def form_payload(dataset, content, name='photo.jpg'):
+    payload = recipe_payload(dataset)
+    payload['ingredients'] = json.dumps(payload['ingredients'])
+    payload['tags'] = json.dumps(payload['tags'])
+    payload['image'] = SimpleUploadedFile(name, content)
+    return payload
+
+
+def test_multipart_upload(user_client, dataset, media_root,
+                          django_capture_on_commit_callbacks):
+    payload = form_payload(dataset, make_jpeg())
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(RECIPES_URL, payload, format='multipart')
+    assert response.status_code == status.HTTP_201_CREATED, response.data
+    recipe = Recipe.objects.get(id=response.data['id'])
+    assert recipe.image_status == Recipe.ImageStatus.READY
+    assert recipe.ingredients_in_recipe.count() == 10
+    assert recipe.tags.count() == len(dataset.tag_ids)
+    assert (media_root / recipe.image.name).exists()
+
+
+def test_upload_name_comes_from_detected_format(
+        user_client, dataset, media_root, django_capture_on_commit_callbacks):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64)).save(buffer, 'PNG')
+    payload = form_payload(dataset, buffer.getvalue(), name='x.html')
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(RECIPES_URL, payload, format='multipart')
+    recipe = Recipe.objects.get(id=response.data['id'])
+    assert recipe.image_status == Recipe.ImageStatus.READY
+    path = PurePosixPath(recipe.image.name)
+    assert path.parent == PurePosixPath('recipies/images')
+    assert path.suffix == '.png' and len(path.stem) == 32
+    assert (media_root / recipe.image.name).exists()
+    assert not any((media_root / PENDING_IMAGE_PATH).iterdir())
+
+
+def test_multipart_upload_streams_to_disk(user_client, dataset, media_root):
+    content = make_jpeg()
+    content += bytes(UPLOAD_SIZE - len(content))
+    body = encode_multipart(BOUNDARY, form_payload(dataset, content))
+    # Первый запрос импортирует URLconf, это не должно попасть в замер.
+    user_client.get('/api/tags/')
+    tracemalloc.start()
+    try:
+        response = user_client.generic('POST', RECIPES_URL, body,
+                                       content_type=MULTIPART_CONTENT)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert response.status_code == status.HTTP_201_CREATED, response.data
+    assert response.data['image_status'] == Recipe.ImageStatus.PENDING
+    # Тестовый клиент держит в памяти одну копию тела запроса.
+    assert peak - len(body) < UPLOAD_SIZE / 4
+
+
+def test_multipart_upload_too_large(user_client, dataset, media_root,
+                                    settings):
+    settings.RECIPE_IMAGE_MAX_SIZE = 1024
+    payload = form_payload(dataset, make_jpeg())
+    response = user_client.post(RECIPES_URL, payload, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'image' in response.data
+
+
+def test_multipart_upload_not_image(user_client, dataset, media_root):
+    payload = form_payload(dataset, b'not an image', name='photo.jpg')
+    response = user_client.post(RECIPES_URL, payload, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'image' in response.data
+
+
+def test_multipart_invalid_ingredients(user_client, dataset, media_root):
+    payload = form_payload(dataset, make_jpeg())
+    payload['ingredients'] = '[{'
+    response = user_client.post(RECIPES_URL, payload, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'ingredients' in response.data
@@ -0,0 +1,198 @@
+"""Фоновая обработка изображений рецептов и их уменьшенные копии."""
+import threading
+from base64 import b64encode
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from constants import (PENDING_IMAGE_PATH, PENDING_IMAGE_TIMEOUT,
+                       RECIPE_IMAGE_VARIANTS)
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+from recipies.images import create_image_variants
+from recipies import tasks
+from recipies.models import Recipe
+from recipies.tasks import executor, store_pending_image, submit
+from rest_framework import status
+
+from .test_query_budget import RECIPES_URL, recipe_payload
+
+pytestmark = pytest.mark.django_db
+
+
+def make_photo(size=(3000, 2000)):
+    image = Image.effect_noise(size, 64).convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=95)
+    return 'data:image/jpeg;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def test_image_is_processed_after_commit(user_client, dataset, media_root):
+    payload = recipe_payload(dataset)
+    payload['image'] = make_photo()
+    response = user_client.post(RECIPES_URL, payload, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['image'] is None
+    assert response.data['image_status'] == Recipe.ImageStatus.PENDING
+    recipe = Recipe.objects.get(id=response.data['id'])
+    assert recipe.pending_image.startswith(PENDING_IMAGE_PATH)
+    assert [path.relative_to(media_root).as_posix()
+            for path in media_root.rglob('*') if path.is_file()] == [
+        recipe.pending_image]
+
+
+def test_stale_pending_image_is_recovered(user_client, dataset, media_root):
+    payload = recipe_payload(dataset)
+    payload['image'] = make_photo((400, 300))
+    response = user_client.post(RECIPES_URL, payload, format='json')
+    recipes = Recipe.objects.filter(id=response.data['id'])
+    call_command('process_pending_images')
+    assert recipes.get().image_status == Recipe.ImageStatus.PENDING
+    recipes.update(updated=timezone.now() - timedelta(
+        seconds=PENDING_IMAGE_TIMEOUT + 1))
+    call_command('process_pending_images')
+    recipe = recipes.get()
+    assert recipe.image_status == Recipe.ImageStatus.READY
+    assert recipe.image_variants_ready and not recipe.pending_image
+    assert (media_root / recipe.image.name).exists()
+    assert not any((media_root / PENDING_IMAGE_PATH).iterdir())
+
+
+def test_pending_recipe_without_payload_fails(user, dataset):
+    recipe = Recipe.objects.create(
+        author=user, name='Рецепт', text='Текст', cooking_time=1,
+        image_status=Recipe.ImageStatus.PENDING)
+    call_command('process_pending_images', age=0)
+    recipe.refresh_from_db()
+    assert recipe.image_status == Recipe.ImageStatus.FAILED
+
+
+def test_invalid_image_is_marked_failed(user_client, dataset, media_root,
+                                        django_capture_on_commit_callbacks):
+    payload = recipe_payload(dataset)
+    payload['image'] = 'data:image/png;base64,bm90IGFuIGltYWdl'
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(RECIPES_URL, payload, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    recipe = Recipe.objects.get(id=response.data['id'])
+    assert recipe.image_status == Recipe.ImageStatus.FAILED
+    assert not recipe.image
+
+
+@pytest.fixture
+def pending_recipe(user, dataset, media_root):
+    return Recipe.objects.create(
+        author=user, name='Рецепт', text='Текст', cooking_time=1,
+        image_status=Recipe.ImageStatus.PENDING,
+        pending_image=store_pending_image(make_photo((400, 300))))
+
+
+def test_newer_pending_image_is_kept(pending_recipe, media_root,
+                                     monkeypatch):
+    newer = store_pending_image(make_photo((400, 300)))
+
+    def replace_image(image):
+        # Второй PATCH успел сохранить новое изображение.
+        Recipe.objects.filter(pk=pending_recipe.pk).update(
+            pending_image=newer)
+        create_image_variants(image)
+
+    monkeypatch.setattr(tasks, 'create_image_variants', replace_image)
+    tasks.process_pending_image(pending_recipe.pk)
+    pending_recipe.refresh_from_db()
+    assert pending_recipe.image_status == Recipe.ImageStatus.PENDING
+    assert pending_recipe.pending_image == newer
+    assert not pending_recipe.image
+    assert [path.relative_to(media_root).as_posix()
+            for path in media_root.rglob('*') if path.is_file()] == [newer]
+
+
+def test_decompression_bomb_is_marked_failed(pending_recipe, monkeypatch):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300)).save(buffer, 'PNG')
+    pending_recipe.pending_image = store_pending_image(
+        SimpleUploadedFile('photo.png', buffer.getvalue()))
+    pending_recipe.save()
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    with pytest.raises(Image.DecompressionBombError):
+        tasks.process_pending_image(pending_recipe.pk)
+    pending_recipe.refresh_from_db()
+    assert pending_recipe.image_status == Recipe.ImageStatus.FAILED
+    assert not pending_recipe.pending_image
+
+
+def test_variants_are_created_on_save(user_client, dataset, media_root,
+                                      django_capture_on_commit_callbacks):
+    payload = recipe_payload(dataset)
+    payload['image'] = make_photo()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(RECIPES_URL, payload, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = user_client.get(f'{RECIPES_URL}{response.data["id"]}/')
+    assert response.data['image_status'] == Recipe.ImageStatus.READY
+    variants = response.data['image_variants']
+    assert set(variants) == set(RECIPE_IMAGE_VARIANTS)
+    original = media_root / response.data['image'].split('/media/')[1]
+    for variant, size in RECIPE_IMAGE_VARIANTS.items():
+        assert set(variants[variant]) == {'jpg', 'webp'}
+        for url in variants[variant].values():
+            path = media_root / url.split('/media/')[1]
+            assert path.parent == original.parent / 'variants' / original.name
+            with Image.open(path) as image:
+                assert image.width <= size[0] and image.height <= size[1]
+            assert path.stat().st_size * 10 < original.stat().st_size
+
+
+def test_missing_variants_are_not_linked(user_client, dataset):
+    response = user_client.post(f'{RECIPES_URL}{dataset.recipe_id}/favorite/')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['image_variants'] is None
+    response = user_client.get(f'{RECIPES_URL}{dataset.recipe_id}/')
+    assert response.data['image_variants'] is None
+
+
+def test_variants_command_backfills_existing_images(
+        user_client, dataset, media_root,
+        django_capture_on_commit_callbacks):
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    path = media_root / recipe.image.name
+    path.parent.mkdir(parents=True)
+    Image.new('RGB', (1200, 900)).save(path, 'PNG')
+    user_client.get(f'{RECIPES_URL}{recipe.id}/')
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('create_image_variants')
+    recipe.refresh_from_db()
+    assert recipe.image_variants_ready
+    response = user_client.get(f'{RECIPES_URL}{recipe.id}/')
+    variants = response.data['image_variants']
+    assert set(variants) == set(RECIPE_IMAGE_VARIANTS)
+    for urls in variants.values():
+        for url in urls.values():
+            assert (media_root / url.split('/media/')[1]).exists()
+
+
+def test_variants_do_not_overwrite_other_images(media_root):
+    recipes_dir = media_root / 'recipies' / 'images'
+    recipes_dir.mkdir(parents=True)
+    Image.new('RGB', (1200, 900)).save(recipes_dir / 'cake.jpg', 'JPEG')
+    Image.new('RGB', (10, 10)).save(recipes_dir / 'cake_small.jpg', 'JPEG')
+    original = (recipes_dir / 'cake_small.jpg').read_bytes()
+    recipe = Recipe(image='recipies/images/cake.jpg')
+    create_image_variants(recipe.image)
+    create_image_variants(recipe.image)
+    assert (recipes_dir / 'cake_small.jpg').read_bytes() == original
+    variants = recipes_dir / 'variants' / 'cake.jpg'
+    assert sorted(path.name for path in variants.iterdir()) == sorted(
+        f'{variant}.{extension}' for variant in RECIPE_IMAGE_VARIANTS
+        for extension in ('jpg', 'webp'))
+
+
+def test_tasks_run_in_worker_pool(settings):
+    settings.IMAGE_TASKS_EAGER = False
+    threads = []
+    submit(lambda: threads.append(threading.current_thread().name))
+    executor.submit(lambda: None).result()
+    assert threads and threads[0].startswith('recipe-images')
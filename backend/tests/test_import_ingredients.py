@@ -0,0 +1,28 @@
+import json
+
+import pytest
+from constants import BASE_DIR
+from django.core.management import call_command
+from recipies.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('file_name', ['ingredients.csv', 'ingredients.json'])
+def test_import_is_idempotent(dataset, budget, capsys, file_name):
+    count = Ingredient.objects.count()
+    with budget(10, max_seconds=5):
+        call_command('import_ingredients', BASE_DIR / 'data' / file_name)
+    assert Ingredient.objects.count() == count
+    assert f'Добавлено: 0, пропущено: {count}' in capsys.readouterr().out
+
+
+def test_import_json_in_batches(dataset, tmp_path, capsys):
+    rows = [{'name': f'новый ингредиент {i % 5}', 'measurement_unit': 'г'}
+            for i in range(10)]
+    rows.append({'name': 'абрикосы', 'measurement_unit': 'г'})
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps(rows, ensure_ascii=False), encoding='utf-8')
+    call_command('import_ingredients', path, batch_size=2)
+    assert 'Добавлено: 5, пропущено: 6' in capsys.readouterr().out
+    assert Ingredient.objects.filter(name__startswith='новый').count() == 5
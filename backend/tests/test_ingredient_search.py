@@ -0,0 +1,32 @@
+import pytest
+from constants import INGREDIENT_SEARCH_LIMIT
+from recipies.models import Ingredient
+
+pytestmark = pytest.mark.django_db
+
+
+def test_prefix_matches_come_first(anon_client):
+    response = anon_client.get('/api/ingredients/?name=лук')
+    names = [item['name'] for item in response.data]
+    assert 0 < len(names) <= INGREDIENT_SEARCH_LIMIT
+    prefix = [name.lower().startswith('лук') for name in names]
+    assert prefix == sorted(prefix, reverse=True)
+    assert any(prefix) and not all(prefix)
+    assert all('лук' in name.lower() for name in names)
+
+
+def test_new_ingredient_is_found(anon_client):
+    anon_client.get('/api/ingredients/?name=ябл')
+    Ingredient.objects.create(name='яблочный уксус особый',
+                              measurement_unit='мл')
+    response = anon_client.get('/api/ingredients/?name=яблочный уксус о')
+    assert [item['name'] for item in response.data] == [
+        'яблочный уксус особый']
+
+
+def test_detail_with_name_filter(anon_client):
+    ingredient = Ingredient.objects.get(name='абрикосы')
+    response = anon_client.get(
+        f'/api/ingredients/{ingredient.id}/?name=абр')
+    assert response.status_code == 200
+    assert response.data['name'] == 'абрикосы'
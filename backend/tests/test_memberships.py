@@ -0,0 +1,63 @@
+"""Флаги избранного, корзины и подписок загружаются один раз на запрос."""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipies.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+MEMBERSHIP_TABLES = tuple(
+    f'"{model._meta.db_table}"'
+    for model in (Favorite, ShoppingCart, Subscription)
+)
+
+
+def membership_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    queries = [query['sql'] for query in context.captured_queries
+               if query['sql'].split(' FROM ')[1].startswith(
+                   MEMBERSHIP_TABLES)]
+    return response, queries
+
+
+@pytest.mark.parametrize('url', [
+    RECIPES_URL + '?limit=50',
+    RECIPES_URL + '?limit=50&is_favorited=1',
+    RECIPES_URL + 'feed/?limit=50',
+    '/api/users/?limit=50',
+    '/api/users/subscriptions/?limit=50&recipes_limit=3',
+])
+def test_at_most_three_membership_queries(user_client, url):
+    _, queries = membership_queries(user_client, url)
+    assert len(queries) <= 3
+
+
+def test_flags_match_database(user_client, user):
+    response, queries = membership_queries(
+        user_client, RECIPES_URL + '?limit=100&is_in_shopping_cart=1')
+    cart = set(ShoppingCart.objects.filter(user=user)
+               .values_list('recipe_id', flat=True))
+    favorites = set(Favorite.objects.filter(user=user)
+                    .values_list('recipe_id', flat=True))
+    followed = set(Subscription.objects.filter(user=user)
+                   .values_list('author_id', flat=True))
+    results = response.data['results']
+    assert {recipe['id'] for recipe in results} == cart
+    for recipe in results:
+        assert recipe['is_in_shopping_cart']
+        assert recipe['is_favorited'] == (recipe['id'] in favorites)
+        assert recipe['author']['is_subscribed'] == (
+            recipe['author']['id'] in followed)
+    assert len(queries) == 3
+
+
+def test_anonymous_has_no_membership_queries(anon_client):
+    response, queries = membership_queries(anon_client, RECIPES_URL)
+    assert not queries
+    assert not any(recipe['is_favorited']
+                   for recipe in response.data['results'])
@@ -0,0 +1,110 @@
+"""Подбор рецептов по имеющимся ингредиентам."""
+import os
+from collections import defaultdict
+
+import pytest
+from recipies.models import IngridientInRecipe, Recipe
+from rest_framework import status
+
+from .conftest import INGREDIENTS_PER_RECIPE
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+COOK_URL = RECIPES_URL + 'cook/'
+BENCHMARK_RECIPES = 100_000
+
+
+def cook(client, ingredient_ids, **params):
+    return client.get(COOK_URL, {'ingredients': ingredient_ids, **params})
+
+
+def expected_ranking(ingredient_ids):
+    ingredients = defaultdict(set)
+    for recipe_id, ingredient_id in IngridientInRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'):
+        ingredients[recipe_id].add(ingredient_id)
+    pub_dates = dict(Recipe.objects.values_list('id', 'pub_date'))
+    ranking = []
+    for recipe_id, recipe_ingredients in ingredients.items():
+        matched = len(recipe_ingredients & set(ingredient_ids))
+        if matched:
+            missing = len(recipe_ingredients) - matched
+            ranking.append((-matched / len(recipe_ingredients), missing,
+                            pub_dates[recipe_id], recipe_id))
+    ranking.sort(key=lambda item: (item[0], item[1], -item[2].timestamp(),
+                                   -item[3]))
+    return [(recipe_id, -coverage, missing)
+            for coverage, missing, _, recipe_id in ranking]
+
+
+def test_cook_ranking(anon_client, dataset):
+    ingredient_ids = dataset.ingredient_ids[:15]
+    response = cook(anon_client, ingredient_ids, limit=100)
+    assert response.status_code == status.HTTP_200_OK
+    expected = expected_ranking(ingredient_ids)
+    assert response.data['count'] == len(expected)
+    assert [(recipe['id'], recipe['coverage'], recipe['missing_count'])
+            for recipe in response.data['results']] == expected[:100]
+
+
+def test_cook_full_coverage_first(anon_client, dataset):
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    ingredient_ids = list(recipe.ingredients_in_recipe.values_list(
+        'ingredient_id', flat=True))
+    results = cook(anon_client, ingredient_ids).data['results']
+    assert results[0]['id'] == recipe.id
+    assert results[0]['coverage'] == 1
+    assert results[0]['matched_count'] == INGREDIENTS_PER_RECIPE
+    assert results[0]['missing_count'] == 0
+
+
+def test_cook_with_filters(user_client, dataset):
+    ingredient_ids = dataset.ingredient_ids[:15]
+    results = cook(user_client, ingredient_ids,
+                   is_favorited=1, limit=100).data['results']
+    favorites = set(Recipe.objects.filter(
+        favorites__user_id=dataset.user_id).values_list('id', flat=True))
+    assert results
+    assert {recipe['id'] for recipe in results} <= favorites
+
+
+@pytest.mark.parametrize('query', ['', '?ingredients=abc',
+                                   '?ingredients=1&cursor='])
+def test_cook_invalid(anon_client, query):
+    response = anon_client.get(COOK_URL + query)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_cook_budget(anon_client, dataset, budget):
+    with budget(6):
+        response = cook(anon_client, dataset.ingredient_ids, page=3)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results']
+
+
+@pytest.mark.skipif(not os.environ.get('BENCHMARK'),
+                    reason='Бенчмарк запускается с BENCHMARK=1')
+def test_cook_benchmark(anon_client, dataset, budget):
+    """Подбор на BENCHMARK_RECIPES рецептах и всем справочнике."""
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    ingredient_ids = list(IngridientInRecipe.objects.values_list(
+        'ingredient_id', flat=True).distinct())
+    Recipe.objects.bulk_create(
+        Recipe(author_id=recipe.author_id, name=f'Рецепт {i}',
+               text='Бенчмарк', cooking_time=1, image=recipe.image.name)
+        for i in range(BENCHMARK_RECIPES - Recipe.objects.count())
+    )
+    created = Recipe.objects.filter(text='Бенчмарк').values_list(
+        'pk', flat=True)
+    IngridientInRecipe.objects.bulk_create(
+        IngridientInRecipe(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_ids[(i * 7 + j) % len(ingredient_ids)],
+            amount=1)
+        for i, recipe_id in enumerate(created)
+        for j in range(INGREDIENTS_PER_RECIPE)
+    )
+    with budget(6, max_seconds=5):
+        response = cook(anon_client, ingredient_ids[:50], page=100)
+    assert response.status_code == status.HTTP_200_OK
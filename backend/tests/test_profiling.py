@@ -0,0 +1,84 @@
+"""Профилирование SQL-запросов по эндпоинтам."""
+import logging
+
+import pytest
+from backend.profiling import (QueryProfilingMiddleware, get_fingerprint,
+                               query_profile)
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework import status
+
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.QUERY_PROFILING_ENABLED = True
+    settings.QUERY_PROFILING_SAMPLE_RATE = 1.0
+    query_profile.reset()
+    yield
+    query_profile.reset()
+
+
+def test_fingerprint_ignores_values():
+    assert get_fingerprint(
+        "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"
+    ) == get_fingerprint(
+        "SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 6")
+
+
+def test_endpoint_stats(profiling, user_client, user):
+    response = user_client.get(RECIPES_URL)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'db;dur=' in response['Server-Timing']
+    assert 'serialization;dur=' in response['Server-Timing']
+    user_client.get('/api/users/subscriptions/')
+
+    user.is_staff = True
+    user.save()
+    response = user_client.get('/api/query-stats/')
+    assert response.status_code == status.HTTP_200_OK
+    recipes = response.data['RecipeViewSet.list']
+    assert recipes['requests'] == 1
+    assert recipes['queries']['max'] > 0
+    assert recipes['response_bytes']['max'] > 0
+    assert recipes['serialization_ms']['max'] > 0
+    assert 'CustomUserViewSet.subscriptions' in response.data
+
+
+def test_query_stats_is_staff_only(profiling, user_client):
+    response = user_client.get('/api/query-stats/')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_sampling(profiling, settings, user_client):
+    settings.QUERY_PROFILING_SAMPLE_RATE = 0
+    response = user_client.get(RECIPES_URL)
+    assert 'Server-Timing' not in response
+    assert query_profile.as_dict() == {}
+
+
+def test_duplicate_queries_are_logged(profiling, caplog):
+    def view(request):
+        for pk in range(5):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT %s', [pk])
+        return HttpResponse('ok')
+
+    middleware = QueryProfilingMiddleware(view)
+    with caplog.at_level(logging.WARNING, logger='backend.profiling'):
+        middleware(RequestFactory().get('/n-plus-one/'))
+    assert 'Повторяющийся запрос в /n-plus-one/ (5 раз): SELECT %s' in (
+        caplog.text)
+    assert query_profile.as_dict()['/n-plus-one/']['duplicate_queries'] == 1
+
+
+def test_plain_response_has_no_serialization_time(profiling):
+    middleware = QueryProfilingMiddleware(lambda request: HttpResponse('ok'))
+    response = middleware(RequestFactory().get('/plain/'))
+    assert 'serialization' not in response['Server-Timing']
+    stats = query_profile.as_dict()['/plain/']
+    assert stats['serialization_ms']['mean'] is None
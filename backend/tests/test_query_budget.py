@@ -0,0 +1,275 @@
+"""Бюджеты SQL-запросов и времени ответа для эндпоинтов API.
+
+Бюджет не зависит от размера страницы и объема данных: если тест падает,
+скорее всего в сериализатор или представление попал запрос N+1.
+"""
+import pytest
+from api.pagination import RecipePagination
+from recipies.models import IngridientInRecipe, Recipe
+from rest_framework import status
+
+from .conftest import AUTHORS_COUNT, IMAGE, RECIPES_COUNT
+
+pytestmark = pytest.mark.django_db
+
+RECIPES_URL = '/api/recipes/'
+
+
+def recipe_payload(dataset, name='Новый рецепт', ingredients_count=10):
+    return {
+        'name': name,
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': IMAGE,
+        'tags': dataset.tag_ids,
+        'ingredients': [
+            {'id': ingredient_id, 'amount': amount}
+            for amount, ingredient_id in enumerate(
+                dataset.ingredient_ids[:ingredients_count], 1)
+        ],
+    }
+
+
+@pytest.mark.parametrize('query', ['', '?page=50', '?limit=6&tags=tag1'])
+def test_recipes_list_anonymous(anon_client, budget, query):
+    with budget(6):
+        response = anon_client.get(RECIPES_URL + query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results']
+
+
+@pytest.mark.parametrize(
+    'query',
+    ['', '?page=50', '?is_favorited=1', '?is_in_shopping_cart=1',
+     '?ordering=popular&page=50', '?ordering=trending'])
+def test_recipes_list(user_client, budget, query):
+    with budget(8):
+        response = user_client.get(RECIPES_URL + query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results']
+
+
+def test_recipes_cursor_pages(user_client, budget):
+    seen = []
+    url = RECIPES_URL + '?cursor=&limit=50'
+    for _ in range(3):
+        with budget(7):
+            response = user_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        seen.extend(recipe['id'] for recipe in response.data['results'])
+        url = response.data['next']
+    assert len(seen) == len(set(seen)) == 150
+    expected = Recipe.objects.order_by('-pub_date', '-id')[:150]
+    assert seen == [recipe.id for recipe in expected]
+
+
+def test_recipes_cursor_deep_page(user_client, budget):
+    last = Recipe.objects.order_by('-pub_date', '-id')[RECIPES_COUNT - 10]
+    cursor = RecipePagination().encode_cursor(last)
+    with budget(7):
+        response = user_client.get(
+            f'{RECIPES_URL}?cursor={cursor}&limit=20&is_favorited=0')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['next'] is None
+    assert len(response.data['results']) == 9
+
+
+def test_recipes_cursor_invalid(user_client):
+    response = user_client.get(RECIPES_URL + '?cursor=broken')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize('query,max_queries',
+                         [('', 7), ('?limit=2&is_favorited=0', 7)])
+def test_recipes_feed(user_client, budget, query, max_queries):
+    with budget(max_queries):
+        response = user_client.get(RECIPES_URL + 'feed/' + query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results']
+    with budget(max_queries if query else 0):
+        response = user_client.get(RECIPES_URL + 'feed/' + query)
+    assert response.status_code == status.HTTP_200_OK
+    with budget(max_queries):
+        response = user_client.get(response.data['next'])
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_recipe_detail(user_client, dataset, budget):
+    with budget(7):
+        response = user_client.get(f'{RECIPES_URL}{dataset.recipe_id}/')
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize('ingredients_count', [1, 30])
+def test_recipe_create(user_client, dataset, media_root, budget,
+                       ingredients_count):
+    payload = recipe_payload(dataset, ingredients_count=ingredients_count)
+    with budget(12):
+        response = user_client.post(RECIPES_URL, payload, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    recipe = Recipe.objects.get(id=response.data['id'])
+    assert list(recipe.ingredients_in_recipe.order_by('amount')
+                .values_list('ingredient_id', 'amount')) == [
+        (item['id'], item['amount']) for item in payload['ingredients']]
+
+
+@pytest.mark.parametrize('ingredients_count', [1, 30])
+def test_recipe_update(user_client, user, dataset, media_root, budget,
+                       ingredients_count):
+    recipe = Recipe.objects.create(author=user, name='Рецепт', text='Текст',
+                                   cooking_time=1)
+    IngridientInRecipe.objects.bulk_create(
+        IngridientInRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                           amount=100)
+        for ingredient_id in dataset.ingredient_ids[5:20]
+    )
+    payload = recipe_payload(dataset, name='Обновленный рецепт',
+                             ingredients_count=ingredients_count)
+    with budget(17):
+        response = user_client.patch(f'{RECIPES_URL}{recipe.id}/', payload,
+                                     format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert list(recipe.ingredients_in_recipe.order_by('amount')
+                .values_list('ingredient_id', 'amount')) == [
+        (item['id'], item['amount']) for item in payload['ingredients']]
+
+
+def test_recipe_favorite(user_client, dataset, budget):
+    url = f'{RECIPES_URL}{dataset.recipe_id}/favorite/'
+    with budget(8):
+        response = user_client.post(url)
+    assert response.status_code == status.HTTP_201_CREATED
+    with budget(6):
+        response = user_client.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_recipe_shopping_cart(user_client, dataset, budget):
+    url = f'{RECIPES_URL}{dataset.recipe_id}/shopping_cart/'
+    with budget(8):
+        response = user_client.post(url)
+    assert response.status_code == status.HTTP_201_CREATED
+    with budget(6):
+        response = user_client.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.parametrize('file_format,signature', [
+    ('', b'%PDF'),
+    ('?format=pdf', b'%PDF'),
+    ('?format=csv', 'Ингредиент'.encode()),
+    ('?format=txt', ' — '.encode()),
+    ('?format=json', b'[{'),
+])
+def test_download_shopping_cart(user_client, budget, file_format,
+                                signature):
+    url = f'{RECIPES_URL}download_shopping_cart/{file_format}'
+    with budget(2):
+        response = user_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert signature in b''.join(response.streaming_content)
+    with budget(1):
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_shopping_cart_etag_follows_ingredients(
+        user_client, user, django_capture_on_commit_callbacks):
+    url = f'{RECIPES_URL}download_shopping_cart/?format=json'
+    etag = user_client.get(url)['ETag']
+    item = IngridientInRecipe.objects.filter(
+        recipe__shopping_cart__user=user).first()
+    with django_capture_on_commit_callbacks(execute=True):
+        item.amount += 1
+        item.save()
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.parametrize('client_name,file_format,status_code', [
+    ('anon_client', '', status.HTTP_401_UNAUTHORIZED),
+    ('user_client', '?format=xml', status.HTTP_404_NOT_FOUND),
+])
+def test_download_shopping_cart_errors(request, client_name, file_format,
+                                       status_code):
+    client = request.getfixturevalue(client_name)
+    response = client.get(
+        f'{RECIPES_URL}download_shopping_cart/{file_format}')
+    assert response.status_code == status_code
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
+
+
+@pytest.mark.parametrize('recipes_limit', ['', '3'])
+def test_subscriptions(user_client, budget, recipes_limit):
+    with budget(3):
+        response = user_client.get(
+            f'/api/users/subscriptions/?recipes_limit={recipes_limit}')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results']
+    for author in response.data['results']:
+        assert author['is_subscribed']
+        assert author['recipes_count'] == RECIPES_COUNT // AUTHORS_COUNT
+        assert len(author['recipes']) == min(
+            int(recipes_limit or author['recipes_count']),
+            author['recipes_count'])
+
+
+def test_subscriptions_pages(user_client, dataset):
+    url = '/api/users/subscriptions/'
+    first = user_client.get(url).data
+    second = user_client.get(first['next']).data
+    ids = [author['id'] for author in first['results'] + second['results']]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids) > len(first['results'])
+    assert user_client.get(url).data['results'] == first['results']
+
+
+def test_subscribe(user_client, dataset, budget):
+    url = f'/api/users/{dataset.other_user_id}/subscribe/'
+    with budget(3):
+        response = user_client.post(url)
+    assert response.status_code == status.HTTP_201_CREATED
+    with budget(4):
+        response = user_client.delete(url)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.parametrize('url', ['/api/users/', '/api/users/me/'])
+def test_users(user_client, budget, url):
+    with budget(3):
+        response = user_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize('query,max_queries',
+                         [('', 1), ('?name=абр', 2), ('?search=мол', 1)])
+def test_ingredients(anon_client, budget, query, max_queries):
+    with budget(max_queries):
+        response = anon_client.get('/api/ingredients/' + query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data
+    with budget(0):
+        response = anon_client.get('/api/ingredients/' + query)
+    assert response['X-Cache'] == 'HIT'
+
+
+def test_tags(anon_client, budget):
+    with budget(1):
+        response = anon_client.get('/api/tags/')
+    assert response.status_code == status.HTTP_200_OK
+    with budget(0):
+        response = anon_client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_cache_stats(user_client, user, budget):
+    user.is_staff = True
+    user.save()
+    with budget(0):
+        response = user_client.get('/api/cache-stats/')
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.data) == {'tags', 'ingredients', 'recipes'}
@@ -0,0 +1,55 @@
+"""Денормализованные счетчики избранного и корзины."""
+import pytest
+from django.core.management import call_command
+from recipies.models import Favorite, Recipe
+from rest_framework import status
+
+from .conftest import CART_COUNT, FAVORITES_COUNT
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+
+def get_counters(recipe_id):
+    return Recipe.objects.values_list(
+        'favorites_count', 'in_carts_count').get(id=recipe_id)
+
+
+@pytest.mark.parametrize('action,field', [
+    ('favorite', 'favorites_count'),
+    ('shopping_cart', 'in_carts_count'),
+])
+def test_actions_update_counters(user_client, dataset, action, field,
+                                 django_capture_on_commit_callbacks):
+    url = f'{RECIPES_URL}{dataset.recipe_id}/{action}/'
+    before = Recipe.objects.values_list(field, flat=True).get(
+        id=dataset.recipe_id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert user_client.post(url).status_code == status.HTTP_201_CREATED
+        user_client.post(url)
+    response = user_client.get(f'{RECIPES_URL}{dataset.recipe_id}/')
+    assert response.data[field] == before + 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.delete(url)
+        user_client.delete(url)
+    response = user_client.get(f'{RECIPES_URL}{dataset.recipe_id}/')
+    assert response.data[field] == before
+
+
+def test_recount_command_repairs_drift(dataset, capsys):
+    recipes = Recipe.objects.order_by('id')
+    first = recipes.first()
+    assert get_counters(first.id) == (1, 1)
+    assert sum(recipes.values_list('favorites_count', flat=True)) == (
+        FAVORITES_COUNT)
+    assert sum(recipes.values_list('in_carts_count', flat=True)) == (
+        CART_COUNT)
+
+    Recipe.objects.filter(id=first.id).update(favorites_count=100)
+    Favorite.objects.filter(recipe=first).delete()
+    capsys.readouterr()
+    call_command('recount_recipe_counters')
+    assert 'Исправлено рецептов: 1' in capsys.readouterr().out
+    assert get_counters(first.id) == (0, 1)
@@ -0,0 +1,100 @@
+"""Кеш ответа GET /api/recipes/{id}/."""
+import pytest
+from api.cache import TimedCacheStats, recipe_detail_cache
+from recipies.models import IngridientInRecipe, Recipe, Tag
+from recipies.signals import recipe_image_processed
+from rest_framework import status
+from users.models import CustomUser
+
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(dataset):
+    return Recipe.objects.get(id=dataset.recipe_id)
+
+
+def get_detail(client, recipe):
+    response = client.get(f'{RECIPES_URL}{recipe.id}/')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+def test_hit_skips_recipe_queries(user_client, anon_client, recipe, budget):
+    recipe_detail_cache.stats = TimedCacheStats()
+    first = get_detail(user_client, recipe)
+    with budget(3):
+        second = get_detail(user_client, recipe)
+    with budget(0):
+        anonymous = get_detail(anon_client, recipe)
+    assert first == second
+    assert anonymous['is_favorited'] is False
+    assert first['image'].startswith('http://testserver/media/')
+    stats = recipe_detail_cache.as_dict()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert stats['hit_ms'] is not None
+
+
+def test_user_flags_are_overlaid(user_client, anon_client, recipe,
+                                 django_capture_on_commit_callbacks):
+    get_detail(anon_client, recipe)
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f'{RECIPES_URL}{recipe.id}/favorite/')
+    data = get_detail(user_client, recipe)
+    assert data['is_favorited'] is True
+    assert data['favorites_count'] == 1
+    assert get_detail(anon_client, recipe)['is_favorited'] is False
+
+
+def test_invalidation(anon_client, recipe,
+                      django_capture_on_commit_callbacks):
+    commit = django_capture_on_commit_callbacks
+    get_detail(anon_client, recipe)
+    with commit(execute=True):
+        recipe.name = 'Новое название'
+        recipe.save()
+    assert get_detail(anon_client, recipe)['name'] == 'Новое название'
+
+    item = IngridientInRecipe.objects.filter(recipe=recipe).first()
+    with commit(execute=True):
+        item.amount = 999
+        item.save()
+    ingredients = get_detail(anon_client, recipe)['ingredients']
+    assert 999 in [ingredient['amount'] for ingredient in ingredients]
+
+    tag = Tag.objects.exclude(recipes=recipe).first()
+    with commit(execute=True):
+        recipe.tags.add(tag)
+    tags = get_detail(anon_client, recipe)['tags']
+    assert tag.id in [item['id'] for item in tags]
+
+    author = CustomUser.objects.get(id=recipe.author_id)
+    with commit(execute=True):
+        author.first_name = 'Другое'
+        author.save()
+    assert get_detail(anon_client, recipe)['author']['first_name'] == (
+        'Другое')
+
+    with commit(execute=True):
+        Recipe.objects.filter(id=recipe.id).update(image_status='failed')
+        recipe_image_processed.send(sender=Recipe, recipe_id=recipe.id)
+    assert get_detail(anon_client, recipe)['image_status'] == 'failed'
+
+
+def test_invalidation_waits_for_commit(anon_client, recipe,
+                                       django_capture_on_commit_callbacks):
+    get_detail(anon_client, recipe)
+    stale = recipe_detail_cache.get(recipe.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.name = 'Новое название'
+        recipe.save()
+        # Параллельный запрос до коммита видит и кеширует старую версию.
+        recipe_detail_cache.set(recipe.id, stale)
+    assert get_detail(anon_client, recipe)['name'] == 'Новое название'
+
+
+def test_missing_recipe(anon_client):
+    response = anon_client.get(f'{RECIPES_URL}999999/')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
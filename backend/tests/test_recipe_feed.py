@@ -0,0 +1,76 @@
+"""Лента рецептов авторов из подписок."""
+import pytest
+from recipies.models import Recipe
+from rest_framework import status
+from users.models import Subscription
+
+from .conftest import AUTHORS_COUNT
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+FEED_URL = RECIPES_URL + 'feed/'
+
+
+def feed_ids(client, url=FEED_URL + '?limit=100'):
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        ids.extend(recipe['id'] for recipe in response.data['results'])
+        url = response.data['next']
+    return ids
+
+
+def test_feed_contains_followed_authors(user_client, user):
+    expected = Recipe.objects.filter(
+        author__subscribed_author__user=user
+    ).order_by('-pub_date', '-id').values_list('id', flat=True)
+    assert feed_ids(user_client) == list(expected)
+
+
+def test_feed_with_thousands_of_authors(user_client, user, budget):
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for author in user.__class__.objects.exclude(
+            subscribed_author__user=user).exclude(pk=user.pk)
+    )
+    with budget(7):
+        response = user_client.get(FEED_URL + '?limit=50')
+    assert len(response.data['results']) == 50
+    assert Subscription.objects.filter(user=user).count() > AUTHORS_COUNT
+
+
+def test_feed_cache_invalidation(user_client, user, dataset,
+                                 django_capture_on_commit_callbacks):
+    first = feed_ids(user_client, FEED_URL)
+    author = Subscription.objects.filter(user=user).first().author
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = Recipe.objects.create(author=author, name='Новый',
+                                       text='Текст', cooking_time=1)
+    assert user_client.get(FEED_URL).data['results'][0]['id'] == recipe.id
+
+    response = user_client.post(f'{RECIPES_URL}{recipe.id}/favorite/')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert user_client.get(FEED_URL).data['results'][0]['is_favorited']
+
+    response = user_client.delete(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    ids = [item['id'] for item in user_client.get(FEED_URL).data['results']]
+    assert recipe.id not in ids
+    assert ids != first
+
+
+def test_feed_requires_authentication(anon_client):
+    response = anon_client.get(FEED_URL)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.parametrize('query,field', [
+    ('?search=суп', 'search'),
+    ('?ordering=popular', 'ordering'),
+])
+def test_feed_rejects_reordering_filters(user_client, query, field):
+    response = user_client.get(FEED_URL + query)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert list(response.data) == [field]
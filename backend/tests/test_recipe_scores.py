@@ -0,0 +1,66 @@
+"""Рейтинги популярности и трендов рецептов."""
+from datetime import timedelta
+
+import pytest
+from api.filters import RecipeFilter
+from django.core.management import call_command
+from django.utils import timezone
+from recipies.models import Favorite, Recipe, ShoppingCart
+from recipies.scores import refresh_scores
+from rest_framework import status
+
+from .conftest import CART_COUNT, FAVORITES_COUNT, RECIPES_COUNT
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+
+def test_incremental_refresh(user_client, dataset):
+    assert refresh_scores(full=True) == RECIPES_COUNT
+    assert refresh_scores() == FAVORITES_COUNT
+
+    for model in (Favorite, ShoppingCart):
+        model.objects.update(created=timezone.now() - timedelta(days=30))
+    assert refresh_scores() == FAVORITES_COUNT
+    assert refresh_scores() == 0
+
+    url = f'{RECIPES_URL}{dataset.recipe_id}/favorite/'
+    assert user_client.post(url).status_code == status.HTTP_201_CREATED
+    assert refresh_scores() == 1
+    recipe = Recipe.objects.get(id=dataset.recipe_id)
+    assert recipe.popularity == 1
+    assert recipe.trending == pytest.approx(1, rel=1e-3)
+
+
+def test_popular_and_trending_ordering(user_client, dataset):
+    recipes = list(Recipe.objects.order_by('id')[:CART_COUNT])
+    old = recipes[0]
+    Favorite.objects.filter(recipe=old).update(
+        created=timezone.now() - timedelta(days=10))
+    Recipe.objects.filter(pk=old.pk).update(favorites_count=100)
+    call_command('refresh_recipe_scores')
+
+    response = user_client.get(RECIPES_URL + '?ordering=popular')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results'][0]['id'] == old.id
+
+    response = user_client.get(RECIPES_URL + '?ordering=trending')
+    trending = [recipe['id'] for recipe in response.data['results']]
+    assert set(trending) <= {recipe.id for recipe in recipes[1:]}
+
+
+@pytest.mark.parametrize('ordering,index', [
+    ('popular', 'recipe_popularity_idx'),
+    ('trending', 'recipe_trending_idx'),
+])
+def test_score_ordering_uses_index(dataset, ordering, index):
+    queryset = RecipeFilter({'ordering': ordering},
+                            Recipe.objects.only('id')).qs
+    plan = queryset[:10].explain()
+    assert index in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_cursor_requires_chronological_ordering(user_client):
+    response = user_client.get(RECIPES_URL + '?ordering=popular&cursor=')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,81 @@
+"""Полнотекстовый поиск рецептов."""
+import pytest
+from recipies.models import Ingredient, IngridientInRecipe, Recipe
+from rest_framework import status
+
+from .test_query_budget import RECIPES_URL, recipe_payload
+
+pytestmark = pytest.mark.django_db
+
+
+def search(client, value):
+    response = client.get(RECIPES_URL, {'search': value, 'limit': 100})
+    assert response.status_code == status.HTTP_200_OK
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+def test_search_by_ingredient_name(anon_client, dataset):
+    ingredient = Ingredient.objects.get(id=dataset.ingredient_ids[0])
+    expected = set(IngridientInRecipe.objects.filter(
+        ingredient=ingredient).values_list('recipe_id', flat=True))
+    response = anon_client.get(
+        RECIPES_URL, {'search': ingredient.name, 'limit': 100})
+    assert response.data['count'] >= len(expected)
+    found = [recipe['id'] for recipe in response.data['results']]
+    assert len(found) == len(set(found))
+    assert expected <= set(found)
+
+
+def test_search_ranks_by_matches(user_client, dataset, media_root,
+                                 django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        for name, text in (('Борщ постный', 'Без мяса'),
+                           ('Борщ', 'Борщ со сметаной, борщ на говядине'),
+                           ('Щи', 'Почти как борщ')):
+            payload = {**recipe_payload(dataset, name=name), 'text': text}
+            response = user_client.post(RECIPES_URL, payload, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+    found = Recipe.objects.in_bulk(search(user_client, 'борщ'))
+    assert [found[pk].name for pk in search(user_client, 'борщ')] == [
+        'Борщ', 'Щи', 'Борщ постный']
+    assert [found[pk].name for pk in search(user_client, 'борщ мяс')] == [
+        'Борщ постный']
+
+
+def test_search_follows_recipe_changes(user_client, dataset, media_root,
+                                       django_capture_on_commit_callbacks):
+    assert search(user_client, 'рататуй') == []
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(
+            RECIPES_URL, recipe_payload(dataset, name='Рататуй'),
+            format='json')
+    recipe_id = response.data['id']
+    assert search(user_client, 'рататуй') == [recipe_id]
+
+    ingredient = Ingredient.objects.get(id=dataset.ingredient_ids[0])
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient.name = 'кабачковая икра'
+        ingredient.save()
+    assert recipe_id in search(user_client, 'кабачковая икра')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.patch(f'{RECIPES_URL}{recipe_id}/', {'name': 'Овощи'},
+                          format='json')
+    assert search(user_client, 'рататуй') == []
+    assert recipe_id in search(user_client, 'овощи')
+
+    user_client.delete(f'{RECIPES_URL}{recipe_id}/')
+    assert recipe_id not in search(user_client, 'овощи')
+
+
+def test_search_with_cursor_is_rejected(anon_client):
+    response = anon_client.get(RECIPES_URL, {'search': 'рецепт',
+                                             'cursor': ''})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_search_budget(anon_client, budget):
+    with budget(6):
+        response = anon_client.get(RECIPES_URL, {'search': 'рецепт 15'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results']
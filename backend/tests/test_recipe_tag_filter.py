@@ -0,0 +1,70 @@
+"""Фильтр рецептов по нескольким тегам."""
+import pytest
+from api.cache import tag_catalog
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipies.models import Recipe, Tag
+from rest_framework import status
+
+from .conftest import RECIPES_COUNT, TAGS_COUNT
+from .test_query_budget import RECIPES_URL
+
+pytestmark = pytest.mark.django_db
+
+
+def recipe_ids(client, query):
+    response = client.get(f'{RECIPES_URL}?limit=100&{query}')
+    assert response.status_code == status.HTTP_200_OK
+    ids = [recipe['id'] for recipe in response.data['results']]
+    assert response.data['count'] == len(ids)
+    return ids
+
+
+def expected_ids(*remainders):
+    recipes = Recipe.objects.order_by('-pub_date', '-id')
+    return [recipe.id for position, recipe in enumerate(
+        recipes.reverse()) if position % TAGS_COUNT in remainders][::-1]
+
+
+def test_any_of_tags_without_duplicates(anon_client):
+    ids = recipe_ids(anon_client, 'tags=tag1&tags=tag2')
+    assert len(ids) == len(set(ids)) == 3 * RECIPES_COUNT // TAGS_COUNT
+    assert ids == expected_ids(0, 1, 2)
+
+
+def test_all_of_tags(anon_client):
+    ids = recipe_ids(anon_client, 'tags=tag1&tags=tag2&tags_mode=all')
+    assert ids == expected_ids(1)
+
+
+def test_all_of_tags_with_unknown_slug(anon_client):
+    assert recipe_ids(
+        anon_client, 'tags=tag1&tags=missing&tags_mode=all') == []
+
+
+def test_unknown_slug_is_ignored(anon_client):
+    assert recipe_ids(anon_client, 'tags=tag1&tags=missing') == (
+        expected_ids(0, 1))
+    assert recipe_ids(anon_client, 'tags=missing') == []
+
+
+def test_tag_ids_from_catalog_cache(anon_client):
+    anon_client.get(RECIPES_URL + '?tags=tag1')
+    with CaptureQueriesContext(connection) as context:
+        response = anon_client.get(RECIPES_URL + '?tags=tag3&tags=tag4')
+    assert response.status_code == status.HTTP_200_OK
+    tag_table = f'FROM "{Tag._meta.db_table}"'
+    assert not any(tag_table in query['sql'] and 'JOIN' not in query['sql']
+                   for query in context.captured_queries)
+
+
+def test_tag_ids_stay_out_of_catalog_responses(anon_client):
+    stats = tag_catalog.as_dict()
+    anon_client.get(RECIPES_URL + '?tags=tag1')
+    anon_client.get(RECIPES_URL + '?tags=tag1')
+    assert tag_catalog.as_dict() == stats
+
+    tag = Tag.objects.create(name='Новый', color='#00FF00', slug='new')
+    recipe = Recipe.objects.order_by('id').first()
+    recipe.tags.add(tag)
+    assert recipe_ids(anon_client, 'tags=new') == [recipe.id]
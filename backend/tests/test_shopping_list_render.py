@@ -0,0 +1,57 @@
+"""Сравнение стоимости рендеринга списка покупок в разных форматах.
+
+Таблица со временем рендеринга печатается при запуске с флагом -s.
+"""
+import time
+
+import pytest
+from api.renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListPDFRenderer,
+                           ShoppingListPlainTextRenderer)
+
+SIZES = (10, 100, 1000)
+LIGHTWEIGHT_RENDERERS = (ShoppingListCSVRenderer,
+                         ShoppingListPlainTextRenderer,
+                         ShoppingListJSONRenderer)
+REPEATS = 3
+
+
+def make_shopping_list(size):
+    return [
+        {'ingredient__name': f'ингредиент {i}',
+         'ingredient__measurement_unit': 'г',
+         'total': i + 1}
+        for i in range(size)
+    ]
+
+
+def render_time(renderer, ingredients):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        renderer.render_file(ingredients).close()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_lightweight_formats_are_cheaper_than_pdf(size):
+    ingredients = make_shopping_list(size)
+    pdf_time = render_time(ShoppingListPDFRenderer(), ingredients)
+    print(f'\n{size} строк: pdf {pdf_time * 1000:.2f} мс', end='')
+    for renderer_class in LIGHTWEIGHT_RENDERERS:
+        elapsed = render_time(renderer_class(), ingredients)
+        print(f', {renderer_class.format} {elapsed * 1000:.2f} мс', end='')
+        assert elapsed < pdf_time
+
+
+@pytest.mark.parametrize('renderer_class',
+                         (ShoppingListPDFRenderer, *LIGHTWEIGHT_RENDERERS))
+def test_renderers_output_every_line(renderer_class):
+    ingredients = make_shopping_list(SIZES[0])
+    content = renderer_class().render(ingredients)
+    if renderer_class is ShoppingListPDFRenderer:
+        assert content.startswith(b'%PDF')
+    else:
+        text = content.decode(renderer_class.charset)
+        assert all(item['ingredient__name'] in text for item in ingredients)
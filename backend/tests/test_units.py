@@ -0,0 +1,97 @@
+"""Перевод единиц измерения и суммирование списка покупок."""
+import csv
+from decimal import Decimal
+
+import pytest
+from api.shopping_list import get_shopping_list
+from constants import CSV_PATH
+from recipies.models import Ingredient, IngridientInRecipe, Recipe
+from recipies.units import (CONVERSIONS, UNIT_SPELLINGS, normalize_unit,
+                            to_base, to_display)
+
+from .test_query_budget import RECIPES_URL
+
+with open(CSV_PATH, encoding='utf-8') as file:
+    CSV_UNITS = {unit for _, unit in csv.reader(file)}
+
+
+def test_csv_units_are_known_spellings():
+    normalized = {normalize_unit(unit) for unit in CSV_UNITS}
+    assert {'г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.'} <= normalized
+    assert all(normalize_unit(unit) == unit
+               for unit in CSV_UNITS & set(UNIT_SPELLINGS))
+
+
+@pytest.mark.parametrize('unit,expected', [
+    ('г', ('г', 1)), ('кг', ('г', 1000)), ('мл', ('мл', 1)),
+    ('л', ('мл', 1000)), ('гр.', ('г', 1)), (' Кг ', ('г', 1000)),
+])
+def test_to_base(unit, expected):
+    assert to_base(unit) == expected
+
+
+def test_csv_units_without_conversion_stay_separate():
+    for unit in CSV_UNITS:
+        base, factor = to_base(unit)
+        if normalize_unit(unit) in CONVERSIONS:
+            assert isinstance(factor, int) and base in ('г', 'мл')
+        else:
+            assert (base, factor) == (normalize_unit(unit), 1)
+
+
+@pytest.mark.parametrize('amount,unit,expected', [
+    (999, 'г', (999, 'г')),
+    (1000, 'г', (1, 'кг')),
+    (1250, 'г', (Decimal('1.25'), 'кг')),
+    (1001, 'мл', (Decimal('1.001'), 'л')),
+    (3000, 'мл', (3, 'л')),
+    (5, 'по вкусу', (5, 'по вкусу')),
+    (2000, 'шт.', (2000, 'шт.')),
+])
+def test_to_display(amount, unit, expected):
+    assert to_display(amount, unit) == expected
+
+
+@pytest.mark.django_db
+def test_shopping_list_sums_convertible_units(user_client, user):
+    recipes = [Recipe.objects.create(author=user, name=f'Рецепт {i}',
+                                     text='Текст', cooking_time=1)
+               for i in range(3)]
+    items = [('сахар', 'кг', 1), ('сахар', 'г', 250), ('сахар', 'ст. л.', 2),
+             ('молоко', 'л', 1), ('молоко', 'мл', 200),
+             ('соль', 'по вкусу', 1)]
+    for position, (name, unit, amount) in enumerate(items):
+        ingredient, _ = Ingredient.objects.get_or_create(
+            name=name, measurement_unit=unit)
+        IngridientInRecipe.objects.create(
+            recipe=recipes[position % len(recipes)], ingredient=ingredient,
+            amount=amount)
+    user.shopping_cart.all().delete()
+    for recipe in recipes:
+        user_client.post(f'{RECIPES_URL}{recipe.id}/shopping_cart/')
+    response = user_client.get(
+        f'{RECIPES_URL}download_shopping_cart/?format=json')
+    content = b''.join(response.streaming_content).decode()
+    assert content == (
+        '[{"name": "молоко", "measurement_unit": "л", "amount": 1.2}, '
+        '{"name": "сахар", "measurement_unit": "кг", "amount": 1.25}, '
+        '{"name": "сахар", "measurement_unit": "ст. л.", "amount": 2}, '
+        '{"name": "соль", "measurement_unit": "по вкусу", "amount": 1}]')
+
+
+@pytest.mark.django_db
+def test_shopping_list_normalizes_spellings(user):
+    recipe = Recipe.objects.create(author=user, name='Рецепт', text='Текст',
+                                   cooking_time=1)
+    items = [('Кг', 1), (' кг ', 2), ('КГ', 1), ('гр', 500), ('Г', 250),
+             ('Шт', 2), ('шт.', 1)]
+    for unit, amount in items:
+        IngridientInRecipe.objects.create(
+            recipe=recipe, amount=amount,
+            ingredient=Ingredient.objects.create(
+                name='продукт с единицами', measurement_unit=unit))
+    user.shopping_cart.all().delete()
+    user.shopping_cart.create(recipe=recipe)
+    assert [(item['ingredient__measurement_unit'], item['total'])
+            for item in get_shopping_list(user)] == [
+        ('кг', Decimal('4.75')), ('шт.', 3)]